@@ -0,0 +1,125 @@
+"""Benchmarks for decoding and encoding NBT and region files.
+
+Generates a deterministic synthetic world, times the core operations
+and writes the results as JSON, so that runs can be compared over time.
+
+    python benchmarks/bench.py --output results.json
+"""
+import argparse
+import gzip
+import json
+import pickle
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from io import BytesIO
+from pathlib import Path
+
+from yonbt import NBTFile, NBTObj, RegionFile, Stats
+
+import worldgen
+
+
+def timeit(func, repeat, setup=None):
+    times = []
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return {
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.fmean(times),
+        'max': max(times)
+    }
+
+
+def encoded(nbt):
+    with BytesIO() as io:
+        nbt.saveNBT(io)
+        return io.getvalue()
+
+
+def run(workdir, seed, repeat, fill):
+    results = {}
+
+    chunk = worldgen.chunk_nbt(worldgen.random.Random(seed), 0, 0)
+    chunk_bytes = encoded(chunk)
+    results['chunk_decode'] = timeit(lambda _: NBTObj(io=BytesIO(chunk_bytes)), repeat * 10)
+    results['chunk_encode'] = timeit(lambda _: encoded(chunk), repeat * 10)
+    results['chunk_decode']['bytes'] = results['chunk_encode']['bytes'] = len(chunk_bytes)
+
+    # as when sending a chunk to a worker process, which then reads it
+    results['chunk_pickle'] = timeit(lambda _: pickle.loads(pickle.dumps(chunk))['Level'], repeat * 10)
+    results['chunk_pickle']['bytes'] = len(pickle.dumps(chunk))
+
+    player = worldgen.playerdata(seed)
+    player_path = workdir / 'player.dat'
+    player_path.write_bytes(gzip.compress(encoded(player)))
+    results['playerdata_load'] = timeit(lambda _: NBTFile(str(player_path)), repeat * 10)
+    loaded = NBTFile(str(player_path))
+    results['playerdata_save'] = timeit(lambda _: loaded.save(), repeat * 10)
+
+    region_path = workdir / 'r.0.0.mca'
+    with open(region_path, 'wb') as io:
+        worldgen.region(seed, fill=fill).encode_region(io)
+    size = region_path.stat().st_size
+
+    results['region_load'] = timeit(lambda _: RegionFile(region_path), repeat)
+    region = RegionFile(region_path)
+    results['region_save'] = timeit(lambda _: region.save(), repeat)
+    results['region_load']['bytes'] = results['region_save']['bytes'] = size
+
+    stats = Stats()
+    RegionFile(region_path, stats=stats).save()
+    results['region_phases'] = stats.as_dict()
+
+    target = next(k for k, c in region.items() if hasattr(c, 'value'))
+
+    def edit_and_save(_):
+        r = RegionFile(region_path)
+        r[target]['Level']['InhabitedTime'].value += 1
+        r.save()
+
+    results['chunk_edit_save'] = timeit(edit_and_save, repeat)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--fill', type=float, default=1.0,
+                        help='fraction of generated chunks in the region')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='write JSON results here instead of stdout')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = run(Path(tmp), args.seed, args.repeat, args.fill)
+
+    report = {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'timestamp': int(time.time()),
+        'seed': args.seed,
+        'fill': args.fill,
+        'results': results
+    }
+
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        args.output.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+import random
+
+from yonbt import TAG_Byte, TAG_Short, TAG_Int, TAG_Long, TAG_Float, TAG_Double, \
+    TAG_Byte_Array, TAG_String, TAG_List, TAG_Compound, TAG_Int_Array, TAG_Long_Array, NBTObj
+from yonbt.region import Chunk, Region, ChunkState, Compression
+
+DATA_VERSION = 2586
+
+BLOCKS = [
+    'minecraft:air', 'minecraft:stone', 'minecraft:dirt', 'minecraft:grass_block',
+    'minecraft:granite', 'minecraft:diorite', 'minecraft:andesite', 'minecraft:gravel',
+    'minecraft:coal_ore', 'minecraft:iron_ore', 'minecraft:water', 'minecraft:bedrock',
+    'minecraft:oak_log', 'minecraft:oak_leaves', 'minecraft:sand', 'minecraft:cave_air'
+]
+
+ITEMS = [
+    'minecraft:cobblestone', 'minecraft:dirt', 'minecraft:oak_planks', 'minecraft:torch',
+    'minecraft:iron_ingot', 'minecraft:diamond', 'minecraft:bread', 'minecraft:wheat_seeds',
+    'minecraft:redstone', 'minecraft:hopper', 'minecraft:string', 'minecraft:bone'
+]
+
+MOBS = [
+    'minecraft:cow', 'minecraft:sheep', 'minecraft:pig', 'minecraft:chicken',
+    'minecraft:zombie', 'minecraft:skeleton', 'minecraft:item', 'minecraft:villager'
+]
+
+
+def _doubles(name, values):
+    return TAG_List(name, [TAG_Double(None, v) for v in values], 6)
+
+
+def _floats(name, values):
+    return TAG_List(name, [TAG_Float(None, v) for v in values], 5)
+
+
+def _compound(name, *tags):
+    return TAG_Compound(name, {t.name: t for t in tags})
+
+
+def _uuid(rng):
+    return TAG_Int_Array('UUID', [rng.randint(-2 ** 31, 2 ** 31 - 1) for _ in range(4)])
+
+
+def _signed64(value):
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def item(rng, slot=None):
+    tags = [
+        TAG_String('id', rng.choice(ITEMS)),
+        TAG_Byte('Count', rng.randint(1, 64))
+    ]
+    if slot is not None:
+        tags.insert(0, TAG_Byte('Slot', slot))
+    return _compound(None, *tags)
+
+
+def section(rng, y):
+    palette = rng.sample(BLOCKS, rng.randint(2, len(BLOCKS)))
+    bits = max(4, (len(palette) - 1).bit_length())
+    per_long = 64 // bits
+    # a handful of repeating patterns keeps the data about as compressible
+    # as real terrain, which is mostly made of long runs of the same blocks
+    patterns = [_signed64(rng.getrandbits(per_long * bits)) for _ in range(rng.randint(2, 8))]
+    states = [rng.choice(patterns) for _ in range(-(-4096 // per_long))]
+    skylight = bytearray(b'\xff' * 2048) if y > 4 else bytearray(rng.choice(b'\x00\x0f\xf0\xff') for _ in range(2048))
+    return _compound(
+        None,
+        TAG_Byte('Y', y),
+        TAG_List('Palette', [_compound(None, TAG_String('Name', n)) for n in palette], 10),
+        TAG_Long_Array('BlockStates', states),
+        TAG_Byte_Array('BlockLight', bytearray(2048)),
+        TAG_Byte_Array('SkyLight', skylight)
+    )
+
+
+def entity(rng, cx, cz):
+    return _compound(
+        None,
+        TAG_String('id', rng.choice(MOBS)),
+        _doubles('Pos', [cx * 16 + rng.random() * 16, rng.uniform(50, 90), cz * 16 + rng.random() * 16]),
+        _doubles('Motion', [0.0, -0.0784, 0.0]),
+        _floats('Rotation', [rng.uniform(0, 360), 0.0]),
+        _uuid(rng),
+        TAG_Float('Health', rng.uniform(1, 20)),
+        TAG_Short('Air', 300),
+        TAG_Short('Fire', -1),
+        TAG_Byte('OnGround', 1),
+        TAG_Int('PortalCooldown', 0)
+    )
+
+
+def tile_entity(rng, cx, cz):
+    return _compound(
+        None,
+        TAG_String('id', 'minecraft:chest'),
+        TAG_Int('x', cx * 16 + rng.randint(0, 15)),
+        TAG_Int('y', rng.randint(5, 120)),
+        TAG_Int('z', cz * 16 + rng.randint(0, 15)),
+        TAG_Byte('keepPacked', 0),
+        TAG_List('Items', [item(rng, s) for s in rng.sample(range(27), rng.randint(0, 27))], 10)
+    )
+
+
+def chunk_nbt(rng, cx, cz, sections=16, entities=8, tile_entities=4):
+    """Builds the root compound of a realistically shaped chunk.
+
+    Layout follows the pre-1.18 anvil format with ``Level``
+    holding sections, entities and tile entities.
+    """
+    level = _compound(
+        'Level',
+        TAG_Int('xPos', cx),
+        TAG_Int('zPos', cz),
+        TAG_Long('LastUpdate', rng.randint(0, 10 ** 7)),
+        TAG_Long('InhabitedTime', rng.randint(0, 10 ** 6)),
+        TAG_String('Status', 'full'),
+        TAG_Byte('isLightOn', 1),
+        TAG_Int_Array('Biomes', [rng.randint(0, 40) for _ in range(1024)]),
+        _compound('Heightmaps', *[
+            TAG_Long_Array(n, [_signed64(rng.getrandbits(63)) for _ in range(37)])
+            for n in ('MOTION_BLOCKING', 'OCEAN_FLOOR', 'WORLD_SURFACE')
+        ]),
+        TAG_List('Sections', [section(rng, y) for y in range(sections)], 10),
+        TAG_List('Entities', [entity(rng, cx, cz) for _ in range(entities)], 10),
+        TAG_List('TileEntities', [tile_entity(rng, cx, cz) for _ in range(tile_entities)], 10)
+    )
+    root = NBTObj()
+    root.name = ''
+    root.value = {'DataVersion': TAG_Int('DataVersion', DATA_VERSION), 'Level': level}
+    return root
+
+
+def region(seed, coords=(0, 0), fill=1.0, **chunk_args):
+    """Builds a `Region` with all 1024 chunk slots.
+
+    ``fill`` is the fraction of slots holding generated chunks,
+    the remaining ones are left as not yet created.
+    """
+    rng = random.Random(seed)
+    reg = Region(coords)
+    for x in range(32):
+        for z in range(32):
+            c = Chunk(x, z)
+            if rng.random() < fill:
+                nbt = chunk_nbt(rng, coords[0] * 32 + x, coords[1] * 32 + z, **chunk_args)
+                c.name, c.value = nbt.name, nbt.value
+                c._compression = Compression.ZLIB
+                c._state = ChunkState.OK
+            reg[x, z] = c
+    return reg
+
+
+def playerdata(seed):
+    rng = random.Random(seed)
+    root = NBTObj()
+    root.name = ''
+    root.value = {t.name: t for t in (
+        TAG_Int('DataVersion', DATA_VERSION),
+        _doubles('Pos', [rng.uniform(-1000, 1000), 64.0, rng.uniform(-1000, 1000)]),
+        _doubles('Motion', [0.0, 0.0, 0.0]),
+        _floats('Rotation', [rng.uniform(0, 360), rng.uniform(-90, 90)]),
+        _uuid(rng),
+        TAG_Float('Health', 20.0),
+        TAG_Int('XpLevel', rng.randint(0, 100)),
+        TAG_Int('playerGameType', 0),
+        TAG_String('Dimension', 'minecraft:overworld'),
+        TAG_List('Inventory', [item(rng, s) for s in rng.sample(range(36), 30)], 10),
+        TAG_List('EnderItems', [item(rng, s) for s in rng.sample(range(27), 20)], 10),
+        _compound('abilities', *[TAG_Byte(n, 0) for n in ('flying', 'instabuild', 'invulnerable', 'mayfly')]),
+        TAG_List('Attributes', [
+            _compound(None, TAG_String('Name', n), TAG_Double('Base', b))
+            for n, b in (('minecraft:generic.max_health', 20.0), ('minecraft:generic.movement_speed', 0.1))
+        ], 10),
+        TAG_List('recipeBook', [TAG_String(None, i) for i in ITEMS], 8)
+    )}
+    return root
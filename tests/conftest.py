@@ -0,0 +1,76 @@
+from io import BytesIO
+
+import pytest
+
+from yonbt.nbt import NBTObj, TAG_Byte, TAG_Short, TAG_Int, TAG_Long, TAG_Float, TAG_Double, TAG_Byte_Array, \
+    TAG_String, TAG_List, TAG_Compound, TAG_Int_Array, TAG_Long_Array
+from yonbt.region import Chunk, ChunkState, Compression, Region
+
+
+def encoded(nbt):
+    """Returns the binary NBT data of a tag, to compare tags by."""
+    with BytesIO() as io:
+        nbt.saveNBT(io)
+        return io.getvalue()
+
+
+def make_nbt():
+    """Returns a root compound holding every tag type and edge cases of their values."""
+    nbt = NBTObj()
+    nbt.name = ''
+    nbt.value = {
+        'byte': TAG_Byte('byte', -128),
+        'short': TAG_Short('short', 32767),
+        'int': TAG_Int('int', -2 ** 31),
+        'long': TAG_Long('long', 2 ** 63 - 1),
+        'float': TAG_Float('float', 0.1),
+        'negativeZero': TAG_Float('negativeZero', -0.0),
+        'double': TAG_Double('double', -1e300),
+        'infinity': TAG_Double('infinity', float('-inf')),
+        'bytes': TAG_Byte_Array('bytes', bytearray(b'\x00\x7f\x80\xff')),
+        'ints': TAG_Int_Array('ints', [0, -1, 2 ** 31 - 1]),
+        'longs': TAG_Long_Array('longs', [-2 ** 63, 1]),
+        'noArray': TAG_Int_Array('noArray', []),
+        'plain': TAG_String('plain', 'minecraft:stone'),
+        'quoted "and" \'escaped\'': TAG_String('quoted "and" \'escaped\'', 'back\\slash\nnewline é\U0001F600'),
+        'null': TAG_String('null', 'null\x00 and \U0001F600'),
+        'number-like': TAG_String('number-like', '12'),
+        'keyword-like': TAG_String('keyword-like', 'true'),
+        'empty': TAG_String('empty', ''),
+        'emptyList': TAG_List('emptyList', [], 0),
+        'floats': TAG_List('floats', [TAG_Float(None, 1.5), TAG_Float(None, -2.0)], 5),
+        'doubles': TAG_List('doubles', [TAG_Double(None, 1.0), TAG_Double(None, 0.5)], 6),
+        'lists': TAG_List('lists', [
+            TAG_List(None, [TAG_Int(None, 1)], 3),
+            TAG_List(None, [], 0)
+        ], 9),
+        'compounds': TAG_List('compounds', [
+            TAG_Compound(None, {'id': TAG_String('id', 'minecraft:chest')}),
+            TAG_Compound(None, {})
+        ], 10)
+    }
+    return nbt
+
+
+@pytest.fixture
+def write_region():
+    """Writes a region file, and the files of its oversized chunks,
+    holding the given chunks, keyed by in-region coordinates."""
+    def write(path, chunks, coords=(0, 0)):
+        region = Region(coords)
+        for x in range(32):
+            for z in range(32):
+                c = Chunk(x, z)
+                if (x, z) in chunks:
+                    c.name, c.value = '', chunks[x, z]
+                    c._compression = Compression.ZLIB
+                    c._state = ChunkState.OK
+                region[x, z] = c
+        external = {}
+        with BytesIO() as io:
+            region.encode_region(io, external)
+            path.write_bytes(io.getvalue())
+        for name, data in external.items():
+            (path.parent / name).write_bytes(data)
+        return path
+    return write
@@ -0,0 +1,54 @@
+from yonbt import chunksInArea, load_area
+from yonbt.nbt import TAG_Compound, TAG_Int
+
+
+def test_chunks_in_area():
+    assert chunksInArea(1, 2, 0, 2) == {(0, 0): [(0, 2), (1, 2)]}
+
+    area = chunksInArea(-2, 30, 1, 33)
+    assert sorted(area) == [(-1, 0), (-1, 1), (0, 0), (0, 1)]
+    assert area[-1, 0] == [(30, 30), (30, 31), (31, 30), (31, 31)]
+    assert area[0, 1] == [(0, 0), (0, 1), (1, 0), (1, 1)]
+    assert sum(map(len, area.values())) == 16
+
+
+def level(x, z):
+    return {'Level': TAG_Compound('Level', {'xPos': TAG_Int('xPos', x), 'zPos': TAG_Int('zPos', z)})}
+
+
+def write_world(directory, write_region, regions):
+    """Writes regions in which every chunk holds its in-world coordinates."""
+    for rx, rz in regions:
+        write_region(directory / f'r.{rx}.{rz}.mca',
+                     {(x, z): level(rx * 32 + x, rz * 32 + z) for x in range(32) for z in range(32)},
+                     coords=(rx, rz))
+
+
+def loaded(chunks):
+    found = {}
+    for world, chunk in chunks:
+        assert (chunk['Level']['xPos'].value, chunk['Level']['zPos'].value) == world
+        found[world] = chunk._coords
+    return found
+
+
+def test_load_area_across_regions(tmp_path, write_region):
+    write_world(tmp_path, write_region, [(-1, -1), (0, -1), (-1, 0), (0, 0)])
+
+    found = loaded(load_area(tmp_path, 1, 1, -2, -3))
+    assert sorted(found) == [(x, z) for x in range(-2, 2) for z in range(-3, 2)]
+    assert found[-2, -3] == (30, 29)
+    assert found[1, 1] == (1, 1)
+
+
+def test_load_area_by_blocks(tmp_path, write_region):
+    write_world(tmp_path, write_region, [(-1, 0), (0, 0)])
+    # blocks -1 and 16 lie in chunks -1 and 1
+    assert sorted(loaded(load_area(tmp_path, -1, 0, 16, 15, blocks=True))) == [(-1, 0), (0, 0), (1, 0)]
+
+
+def test_load_area_skips_missing(tmp_path, write_region):
+    write_region(tmp_path / 'r.1.0.mca', {(0, 0): level(32, 0)}, coords=(1, 0))
+    # region (0, 0) does not exist, region (1, 0) holds only one chunk
+    assert sorted(loaded(load_area(tmp_path, 30, 0, 33, 1))) == [(32, 0)]
+    assert not list(load_area(tmp_path / 'nothing', 0, 0, 100, 100))
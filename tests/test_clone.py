@@ -0,0 +1,84 @@
+from yonbt.nbt import TAG_Compound, TAG_List, TAG_Int, TAG_String, TAG_Int_Array, TAG_Byte_Array
+
+
+def make_root():
+    return TAG_Compound('root', {
+        'Items': TAG_List('Items', [TAG_String(None, 'minecraft:stone')], 8),
+        'x': TAG_Int('x', 1),
+        'Nested': TAG_Compound('Nested', {'y': TAG_Int('y', 2)}),
+        'Ints': TAG_Int_Array('Ints', [1, 2, 3]),
+        'Bytes': TAG_Byte_Array('Bytes', bytearray(b'\x01\x02'))
+    })
+
+
+def test_held_container_stays_attached_to_original():
+    root = make_root()
+    items = root['Items']
+    clone = root.clone()
+    items.append(TAG_String(None, 'minecraft:dirt'))
+
+    assert root['Items'] is items
+    assert len(root['Items']) == 2
+    assert len(clone['Items']) == 1
+
+
+def test_held_leaf_does_not_leak_into_clone():
+    root = make_root()
+    x = root['x']
+    clone = root.clone()
+    x.value = 5
+
+    assert root['x'] is x
+    assert clone['x'].value == 1
+
+
+def test_held_nested_tag_does_not_leak_into_clone():
+    root = make_root()
+    y = root['Nested']['y']
+    clone = root.clone()
+    y.value = 7
+
+    assert root['Nested']['y'] is y
+    assert clone['Nested']['y'].value == 2
+
+
+def test_clone_edits_do_not_reach_original():
+    root = make_root()
+    clone = root.clone()
+    clone['Items'].append(TAG_String(None, 'minecraft:dirt'))
+    clone['x'].value = 9
+    clone['Nested']['z'] = TAG_Int('z', 3)
+    del clone['Ints']
+
+    assert len(root['Items']) == 1
+    assert root['x'].value == 1
+    assert 'z' not in root['Nested']
+    assert 'Ints' in root
+
+
+def test_arrays_copy_on_write():
+    root = make_root()
+    ints = root['Ints']
+    clone = root.clone()
+    assert clone['Ints']._value is ints._value
+
+    ints.append(4)
+    assert list(clone['Ints']) == [1, 2, 3]
+    assert root['Ints'] is ints
+
+    clone['Bytes'].value[0] = 9
+    assert root['Bytes'].value == bytearray(b'\x01\x02')
+    assert clone['Bytes'].value == bytearray(b'\x09\x02')
+
+
+def test_clone_of_clone():
+    root = make_root()
+    first = root.clone()
+    second = first.clone()
+    second['Ints'].append(4)
+    first['Items'].append(TAG_String(None, 'minecraft:dirt'))
+
+    assert list(root['Ints']) == [1, 2, 3]
+    assert list(first['Ints']) == [1, 2, 3]
+    assert len(second['Items']) == 1
+    assert len(root['Items']) == 1
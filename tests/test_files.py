@@ -0,0 +1,122 @@
+import gzip
+import os
+import zlib
+
+from io import BytesIO
+
+import pytest
+
+from yonbt import jobs, NBTFile, RegionFile, ChunkState, Compression
+from yonbt.nbt import NBTObj, TAG_Byte_Array, TAG_Compound, TAG_Int
+from yonbt.region import SECTOR_LEN
+
+
+def nbt_bytes():
+    nbt = NBTObj()
+    nbt.name = ''
+    nbt.value = {'a': TAG_Int('a', 1)}
+    with BytesIO() as io:
+        nbt.saveNBT(io)
+        return io.getvalue()
+
+
+@pytest.mark.parametrize('compress, decompress, compression', [
+    (gzip.compress, gzip.decompress, Compression.GZIP),
+    (zlib.compress, zlib.decompress, Compression.ZLIB),
+    (lambda raw: raw, lambda raw: raw, Compression.NONE)
+])
+def test_compression_is_detected_and_kept(tmp_path, compress, decompress, compression):
+    path = tmp_path / 'level.dat'
+    path.write_bytes(compress(nbt_bytes()))
+    nbt = NBTFile(str(path))
+    assert nbt.compression is compression
+    nbt['a'].value = 2
+    nbt.save()
+    # gzip headers hold the time of compression, so only the magic bytes are compared
+    saved = path.read_bytes()
+    assert saved[:2] == compress(nbt_bytes())[:2]
+    assert decompress(saved) == nbt_bytes().replace(b'\x00\x00\x00\x01', b'\x00\x00\x00\x02')
+
+
+@pytest.mark.parametrize('name, magic', [('GZIP', b'\x1f\x8b'), ('NONE', b'\x0a\x00')])
+def test_legacy_compression_names(tmp_path, name, magic):
+    path = tmp_path / 'level.dat'
+    path.write_bytes(nbt_bytes())
+    nbt = NBTFile(str(path))
+    nbt.compression = name
+    nbt.save()
+    assert path.read_bytes()[:2] == magic
+    assert NBTFile(str(path))['a'].value == 1
+
+
+def test_unknown_compression_is_rejected_before_writing(tmp_path):
+    path = tmp_path / 'level.dat'
+    path.write_bytes(nbt_bytes())
+    nbt = NBTFile(str(path))
+    nbt.compression = 'LZ4'
+    with pytest.raises(ValueError):
+        nbt.save()
+    assert path.read_bytes() == nbt_bytes()
+
+
+def big_chunk(size):
+    # random data does not compress, so the chunk takes about ``size`` bytes in the region
+    return {'Level': TAG_Compound('Level', {
+        'Data': TAG_Byte_Array('Data', bytearray(os.urandom(size)))
+    })}
+
+
+def test_oversized_chunk_cycle(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.-1.2.mca', {(3, 4): big_chunk(2 * 2 ** 20)}, coords=(-1, 2))
+    mcc = tmp_path / 'c.-29.68.mcc'
+    assert mcc.is_file()
+    assert path.stat().st_size < 4 * SECTOR_LEN
+
+    region = RegionFile(str(path))
+    chunk = region[3, 4]
+    assert chunk.state is ChunkState.TOO_BIG
+    assert len(chunk['Level']['Data'].value) == 2 * 2 ** 20
+
+    # still oversized after an edit, the external file is rewritten
+    data = bytearray(os.urandom(2 * 2 ** 20))
+    chunk['Level']['Data'].value = data
+    region.save()
+    assert mcc.is_file()
+    assert RegionFile(str(path))[3, 4]['Level']['Data'].value == data
+
+    # small enough again, the chunk moves back into the region
+    chunk['Level']['Data'].value = bytearray(16)
+    region.save()
+    assert not mcc.exists()
+    reloaded = RegionFile(str(path))
+    assert reloaded[3, 4]['Level']['Data'].value == bytearray(16)
+    assert reloaded[3, 4].state is ChunkState.OK
+
+
+def test_chunk_becomes_oversized(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.0.0.mca', {(0, 0): big_chunk(16), (1, 0): big_chunk(16)})
+    region = RegionFile(str(path))
+    neighbour = bytes(region[1, 0]['Level']['Data'].value)
+    region[0, 0]['Level']['Data'].value = bytearray(os.urandom(2 * 2 ** 20))
+    region.save()
+    assert (tmp_path / 'c.0.0.mcc').is_file()
+
+    reloaded = RegionFile(str(path))
+    assert len(reloaded[0, 0]['Level']['Data'].value) == 2 * 2 ** 20
+    assert reloaded[1, 0]['Level']['Data'].value == neighbour
+
+
+def test_jobs_remove_stale_external_files(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.0.0.mca', {(5, 5): big_chunk(2 * 2 ** 20)})
+    assert (tmp_path / 'c.5.5.mcc').is_file()
+
+    result = jobs.run(tmp_path, shrink, workers=0)
+    assert result.modified_chunks == 1
+    assert not (tmp_path / 'c.5.5.mcc').exists()
+    assert not list(tmp_path.glob('*.tmp'))
+    assert RegionFile(str(path))[5, 5]['Level']['Data'].value == bytearray(16)
+
+
+def shrink(chunk):
+    chunk['Level']['Data'].value = bytearray(16)
+    return True
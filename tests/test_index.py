@@ -0,0 +1,38 @@
+from yonbt import WorldIndex
+from yonbt.index import TILE_ENTITY
+from yonbt.nbt import TAG_Byte, TAG_Compound, TAG_Int, TAG_List, TAG_String
+
+
+def chest(x, item):
+    return TAG_Compound(None, {
+        'id': TAG_String('id', 'minecraft:chest'),
+        'x': TAG_Int('x', x), 'y': TAG_Int('y', 64), 'z': TAG_Int('z', 0),
+        'Items': TAG_List('Items', [TAG_Compound(None, {
+            'id': TAG_String('id', item), 'Count': TAG_Byte('Count', 1)
+        })], 10)
+    })
+
+
+def level(*tile_entities):
+    return {'Level': TAG_Compound('Level', {
+        'TileEntities': TAG_List('TileEntities', list(tile_entities), 10)
+    })}
+
+
+def test_find(tmp_path, write_region):
+    write_region(tmp_path / 'r.-1.0.mca', {(0, 0): level(chest(-512, 'minecraft:diamond')),
+                                          (1, 0): level(chest(-496, 'minecraft:stone'))}, coords=(-1, 0))
+    with WorldIndex(tmp_path / 'index.db') as index:
+        assert index.update(tmp_path) == 2
+        found = index.find(id='minecraft:chest', item='minecraft:diamond')
+        assert [(e.kind, e.x, e.chunk) for e in found] == [(TILE_ENTITY, -512, (-32, 0))]
+        # nothing changed, nothing to decode
+        assert index.update(tmp_path) == 0
+
+
+def test_invalid_region_names_are_skipped(tmp_path, write_region):
+    write_region(tmp_path / 'r.0.0.mca', {(0, 0): level(chest(0, 'minecraft:diamond'))})
+    (tmp_path / 'r.backup.old.mca').write_bytes((tmp_path / 'r.0.0.mca').read_bytes())
+    with WorldIndex(tmp_path / 'index.db') as index:
+        assert index.update(tmp_path) == 1
+        assert len(index.find(item='minecraft:diamond')) == 1
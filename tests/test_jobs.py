@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from yonbt import jobs, RegionFile
+from yonbt.nbt import TAG_Compound, TAG_Int
+
+
+def level(value):
+    return {'Level': TAG_Compound('Level', {'Value': TAG_Int('Value', value)})}
+
+
+def increment(chunk):
+    chunk['Level']['Value'].value += 1
+    return True
+
+
+def fail_on_negative(chunk):
+    if chunk['Level']['Value'].value < 0:
+        raise ValueError('negative value')
+    return increment(chunk)
+
+
+def keep(chunk):
+    return False
+
+
+def test_regions_are_transformed(tmp_path, write_region):
+    first = write_region(tmp_path / 'r.0.0.mca', {(0, 0): level(1), (31, 31): level(2)})
+    second = write_region(tmp_path / 'r.-1.0.mca', {(4, 2): level(3)}, coords=(-1, 0))
+    progress = []
+
+    result = jobs.run(tmp_path, increment, workers=2, progress=progress.append)
+    assert (result.regions, result.modified_regions, result.chunks, result.modified_chunks) == (2, 2, 3, 3)
+    assert [p.regions_done for p in progress] == [1, 2]
+    assert RegionFile(str(first))[31, 31]['Level']['Value'].value == 3
+    assert RegionFile(str(second))[4, 2]['Level']['Value'].value == 4
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_failure_leaves_world_unchanged(tmp_path, write_region):
+    paths = [write_region(tmp_path / f'r.{x}.0.mca', {(0, 0): level(x)}, coords=(x, 0)) for x in range(3)]
+    paths.append(write_region(tmp_path / 'r.3.0.mca', {(0, 0): level(-1)}, coords=(3, 0)))
+    originals = [path.read_bytes() for path in paths]
+
+    with pytest.raises(ValueError):
+        jobs.run(tmp_path, fail_on_negative, workers=2)
+    assert [path.read_bytes() for path in paths] == originals
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_unmodified_regions_are_not_written(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.0.0.mca', {(1, 1): level(1)})
+    raw = path.read_bytes()
+    os.utime(path, (1000000000, 1000000000))
+
+    result = jobs.run(tmp_path, keep, workers=2)
+    assert (result.chunks, result.modified_regions, result.modified_chunks) == (1, 0, 0)
+    assert path.stat().st_mtime == 1000000000
+    assert path.read_bytes() == raw
+
+
+def test_invalid_region_names_are_skipped(tmp_path, write_region):
+    # would be read as region (0, 0), and overwrite its oversized chunks' files
+    backup = write_region(tmp_path / 'r.backup.old.mca', {(0, 0): level(1)})
+    raw = backup.read_bytes()
+    path = write_region(tmp_path / 'r.0.0.mca', {(0, 0): level(1)})
+
+    result = jobs.run(tmp_path, increment, workers=0)
+    assert (result.regions, result.modified_chunks) == (1, 1)
+    assert backup.read_bytes() == raw
+    assert RegionFile(str(path))[0, 0]['Level']['Value'].value == 2
@@ -0,0 +1,31 @@
+import pickle
+
+import pytest
+
+from yonbt.nbt import NBTObj, NBTException
+
+from conftest import encoded, make_nbt
+
+
+@pytest.mark.parametrize('compression', [None, 6])
+def test_roundtrip(compression, monkeypatch):
+    monkeypatch.setattr(NBTObj, 'pickle_compression', compression)
+    nbt = make_nbt()
+    loaded = pickle.loads(pickle.dumps(nbt))
+    assert '_nbt' in loaded.__dict__
+    assert encoded(loaded) == encoded(nbt)
+    assert loaded['null'].value == 'null\x00 and \U0001F600'
+
+
+def test_undecoded_payload_is_passed_on():
+    loaded = pickle.loads(pickle.dumps(make_nbt()))
+    again = pickle.loads(pickle.dumps(loaded))
+    assert '_nbt' in loaded.__dict__
+    assert encoded(again) == encoded(make_nbt())
+
+
+def test_invalid_payload():
+    loaded = pickle.loads(pickle.dumps(make_nbt()))
+    loaded.__dict__['_nbt'] = False, b'\x03\x00'
+    with pytest.raises(NBTException):
+        loaded['int']
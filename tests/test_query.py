@@ -0,0 +1,166 @@
+import random
+
+import pytest
+
+from yonbt.nbt import NBTObj, TAG_Byte, TAG_Int, TAG_Long, TAG_Double, TAG_String, TAG_List, TAG_Compound, \
+    TAG_Int_Array, TAG_Byte_Array
+from yonbt import RegionFile
+from yonbt.query import Query, select
+from yonbt.region import Chunk
+
+from conftest import encoded
+
+
+ITEMS = ['minecraft:diamond', 'minecraft:stone', 'minecraft:torch']
+CONTAINERS = ['minecraft:chest', 'minecraft:barrel']
+
+
+def item(id, count):
+    return TAG_Compound(None, {'id': TAG_String('id', id), 'Count': TAG_Byte('Count', count)})
+
+
+def container(id, items):
+    return TAG_Compound(None, {'id': TAG_String('id', id), 'Items': TAG_List('Items', items, 10)})
+
+
+def chunk(tile_entities, **extra):
+    level = {'TileEntities': TAG_List('TileEntities', tile_entities, 10)}
+    level.update(extra)
+    nbt = NBTObj()
+    nbt.name = ''
+    nbt.value = {'Level': TAG_Compound('Level', level)}
+    return nbt
+
+
+def random_chunk(rng):
+    return chunk(
+        [container(rng.choice(CONTAINERS),
+                   [item(rng.choice(ITEMS), rng.randint(1, 64)) for _ in range(rng.randint(0, 4))])
+         for _ in range(rng.randint(0, 3))],
+        xPos=TAG_Int('xPos', rng.randint(-5, 5)),
+        InhabitedTime=TAG_Long('InhabitedTime', rng.randint(0, 100)),
+        Status=TAG_String('Status', rng.choice(['full', 'spawn', 'features'])),
+        Biomes=TAG_Int_Array('Biomes', [rng.randint(0, 3) for _ in range(4)]),
+        Light=TAG_Byte_Array('Light', bytearray(rng.getrandbits(8) for _ in range(4))),
+        Pos=TAG_List('Pos', [TAG_Double(None, rng.uniform(0, 100)) for _ in range(3)], 6),
+        Tags=TAG_List('Tags', [TAG_String(None, t) for t in rng.sample(['a', 'b', 'c'], rng.randint(0, 3))], 8)
+    )
+
+
+def matches(query, nbt):
+    """Evaluates both ways, which always have to agree."""
+    on_tags = query.matches(nbt)
+    assert query.matches_nbt(encoded(nbt)) == on_tags
+    return on_tags
+
+
+CHEST_WITH_DIAMONDS = (
+    ('Level.TileEntities[].id', '==', 'minecraft:chest'),
+    ('Level.TileEntities[].Items[].id', '==', 'minecraft:diamond')
+)
+
+
+def test_conditions_under_same_list_hold_for_same_element():
+    query = Query(*CHEST_WITH_DIAMONDS)
+    assert not matches(query, chunk([
+        container('minecraft:chest', [item('minecraft:stone', 1)]),
+        container('minecraft:barrel', [item('minecraft:diamond', 1)])
+    ]))
+    assert matches(query, chunk([
+        container('minecraft:barrel', [item('minecraft:diamond', 1)]),
+        container('minecraft:chest', [item('minecraft:stone', 1), item('minecraft:diamond', 1)])
+    ]))
+
+
+def test_nested_list_scope():
+    query = Query(('Level.TileEntities[].Items[].id', '==', 'minecraft:diamond'),
+                  ('Level.TileEntities[].Items[].Count', '>=', 10))
+    assert not matches(query, chunk([
+        container('minecraft:chest', [item('minecraft:diamond', 1), item('minecraft:stone', 20)])
+    ]))
+    assert matches(query, chunk([
+        container('minecraft:chest', [item('minecraft:stone', 20), item('minecraft:diamond', 12)])
+    ]))
+
+
+def test_index_and_wildcard():
+    nbt = chunk([container('minecraft:barrel', []), container('minecraft:chest', [])])
+    assert matches(Query(('Level.TileEntities[1].id', '==', 'minecraft:chest')), nbt)
+    assert not matches(Query(('Level.TileEntities[0].id', '==', 'minecraft:chest')), nbt)
+    assert not matches(Query(('Level.TileEntities[5].id', 'exists')), nbt)
+
+
+@pytest.mark.parametrize('op, value, expected', [
+    ('==', 3, True),
+    ('!=', 3, False),
+    ('<', 4, True),
+    ('>=', 4, False),
+    ('in', (1, 3), True),
+    ('exists', None, True),
+    ('contains', 3, False),
+    ('<', 'not comparable', False)
+])
+def test_operators(op, value, expected):
+    assert matches(Query(('Level.xPos', op, value)), chunk([], xPos=TAG_Int('xPos', 3))) is expected
+
+
+def test_missing_path():
+    assert not matches(Query(('Level.Nothing', 'exists')), chunk([]))
+    assert not matches(Query(('Level.TileEntities.id', '==', 'x')), chunk([]))
+
+
+def test_invalid_query():
+    with pytest.raises(ValueError):
+        Query(('Level.xPos', '~', 1))
+    with pytest.raises(ValueError):
+        Query(('Level..[x]', '==', 1))
+
+
+QUERIES = [
+    CHEST_WITH_DIAMONDS,
+    (('Level.TileEntities[].Items[].id', '==', 'minecraft:diamond'),
+     ('Level.TileEntities[].Items[].Count', '>', 32)),
+    (('Level.TileEntities[]', 'exists'), ('Level.xPos', '>=', 0)),
+    (('Level.TileEntities[0].Items[1].id', '!=', 'minecraft:torch'),),
+    (('Level.Biomes', 'contains', 2), ('Level.Status', 'in', ('full', 'spawn'))),
+    (('Level.Light', 'contains', 7),),
+    (('Level.Pos[1]', '<', 50.0), ('Level.InhabitedTime', '<=', 50)),
+    (('Level.Tags', 'contains', 'b'), ('Level.Tags', '!=', [])),
+    (('Level.TileEntities', '==', []),),
+    (('Level', 'exists'),)
+]
+
+
+@pytest.mark.parametrize('conditions', QUERIES)
+def test_binary_and_tag_evaluation_agree(conditions):
+    rng = random.Random(0)
+    query = Query(*conditions)
+    results = [matches(query, random_chunk(rng)) for _ in range(200)]
+    # make sure the queries match at all
+    assert any(results)
+
+
+def chest_chunk(id):
+    return {'Level': TAG_Compound('Level', {
+        'TileEntities': TAG_List('TileEntities', [container(id, [item('minecraft:diamond', 1)])], 10)
+    })}
+
+
+def test_select(tmp_path, write_region):
+    write_region(tmp_path / 'r.0.0.mca', {(1, 2): chest_chunk('minecraft:chest'),
+                                          (3, 4): chest_chunk('minecraft:barrel')})
+    negative = write_region(tmp_path / 'r.-1.-2.mca', {(31, 0): chest_chunk('minecraft:chest')}, coords=(-1, -2))
+    # would be read as region (0, 0), duplicating its chunks under wrong coordinates
+    write_region(tmp_path / 'r.backup.old.mca', {(5, 5): chest_chunk('minecraft:chest')})
+    query = Query(*CHEST_WITH_DIAMONDS)
+
+    found = {world: chunk for world, chunk in query.select(tmp_path)}
+    assert sorted(found) == [(-1, -64), (1, 2)]
+    assert all(isinstance(c, Chunk) and c['Level']['TileEntities'][0]['id'].value == 'minecraft:chest'
+               for c in found.values())
+
+    assert [world for world, _ in select(negative, *CHEST_WITH_DIAMONDS)] == [(-1, -64)]
+
+    region = RegionFile(str(negative))
+    assert [world for world, _ in query.select(region)] == [(-1, -64)]
+    assert not list(Query(('Level.TileEntities[].id', '==', 'minecraft:furnace')).select(region))
@@ -0,0 +1,28 @@
+import pytest
+
+from yonbt.region import Chunk, Region
+
+
+def test_keys():
+    region = Region((2, -1))
+    for x in range(32):
+        for z in range(32):
+            region[x, z] = Chunk(x, z)
+
+    # in-world coordinates are converted to in-region ones
+    assert region[64, -32] is region[0, 0]
+    assert region[95, -1] is region[31, 31]
+    chunk = Chunk(5, 6)
+    region[69, -26] = chunk
+    assert region[5, 6] is chunk
+    del region[69, -26]
+    assert region[5, 6] is not chunk and region[5, 6]._coords == (5, 6)
+
+    for key in ((96, 0), (63, -32), (64, -33), (-1, 40)):
+        with pytest.raises(KeyError):
+            region[key]
+        with pytest.raises(KeyError):
+            region[key] = Chunk(0, 0)
+        with pytest.raises(KeyError):
+            del region[key]
+    assert len(region) == 1024
@@ -0,0 +1,135 @@
+import json
+import math
+
+from io import BytesIO, StringIO
+
+import pytest
+
+from yonbt import snbt
+from yonbt.nbt import NBTObj, NBTException, TAG_Byte, TAG_Short, TAG_Int, TAG_Long, TAG_Float, TAG_Double, \
+    TAG_String
+
+from conftest import encoded, make_nbt
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_snbt_roundtrip(indent):
+    nbt = make_nbt()
+    loaded = snbt.loads(snbt.dumps(nbt, indent=indent))
+    assert isinstance(loaded, NBTObj)
+    assert encoded(loaded) == encoded(nbt)
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_json_roundtrip(indent):
+    nbt = make_nbt()
+    text = snbt.dumps_json(nbt, indent=indent)
+    # strict JSON, without NaN or Infinity
+    json.loads(text, parse_constant=pytest.fail)
+    assert encoded(snbt.loads_json(text)) == encoded(nbt)
+
+
+def test_file_functions():
+    nbt = make_nbt()
+    with StringIO() as fp:
+        snbt.dump(nbt, fp)
+        fp.seek(0)
+        assert encoded(snbt.load(fp)) == encoded(nbt)
+    with StringIO() as fp:
+        snbt.dump_json(nbt, fp)
+        fp.seek(0)
+        assert encoded(snbt.load_json(fp)) == encoded(nbt)
+
+
+@pytest.mark.parametrize('fmt, dumps', [('snbt', snbt.dumps), ('json', snbt.dumps_json)])
+@pytest.mark.parametrize('indent', [None, 4])
+def test_convert_matches_dump(fmt, dumps, indent):
+    nbt = make_nbt()
+    with StringIO() as fp:
+        snbt.convert(BytesIO(encoded(nbt)), fp, fmt, indent)
+        assert fp.getvalue() == dumps(nbt, indent=indent)
+
+
+@pytest.mark.parametrize('cls, typeID', [(TAG_Float, 5), (TAG_Double, 6)])
+@pytest.mark.parametrize('value, text', [
+    (-0.0, '-0.0'),
+    (2.0, '2.0'),
+    (float('-inf'), '"-Infinity"')
+])
+def test_json_floats(cls, typeID, value, text):
+    dumped = snbt.dumps_json(cls(None, value))
+    assert dumped == f'[{typeID}, {text}]'
+    loaded = snbt.loads_json(dumped).value
+    assert loaded == value and math.copysign(1, loaded) == math.copysign(1, value)
+
+
+def test_json_nan():
+    assert snbt.dumps_json(TAG_Float(None, float('nan'))) == '[5, "NaN"]'
+    assert math.isnan(snbt.loads_json('[6, "NaN"]').value)
+
+
+def test_float_precision():
+    assert snbt.dumps(TAG_Float(None, 0.1)) == '0.1f'
+    assert snbt.loads('0.1f').value == TAG_Float(None, 0.1).value
+
+
+@pytest.mark.parametrize('text, cls, value', [
+    ('1b', TAG_Byte, 1),
+    ('-2s', TAG_Short, -2),
+    ('3', TAG_Int, 3),
+    ('4L', TAG_Long, 4),
+    ('1.5f', TAG_Float, 1.5),
+    ('1.5', TAG_Double, 1.5),
+    ('2d', TAG_Double, 2.0),
+    ('1e3', TAG_Double, 1000.0),
+    ('true', TAG_Byte, 1),
+    ('false', TAG_Byte, 0),
+    ('stone_bricks', TAG_String, 'stone_bricks'),
+    ('"minecraft:stone"', TAG_String, 'minecraft:stone'),
+    ("'single \"quoted\"'", TAG_String, 'single "quoted"'),
+    ('"esc\\"aped"', TAG_String, 'esc"aped')
+])
+def test_scalars(text, cls, value):
+    t = snbt.loads(text)
+    assert type(t) is cls
+    assert t.value == value
+
+
+def test_whitespace_and_arrays():
+    t = snbt.loads(' { a : [ B ; 1b , -1b ] , "b c" : [I;] , d:[L; 5l] } ')
+    assert t['a'].value == bytearray(b'\x01\xff')
+    assert list(t['b c']) == []
+    assert list(t['d']) == [5]
+
+
+@pytest.mark.parametrize('text', [
+    '{a: "unterminated}',
+    '{a: 1',
+    '{a 1}',
+    '{a: 1} trailing',
+    '[1, 2b]',
+    '[1 2]',
+    '[I; 1, x]',
+    '[I; 1.5]',
+    '{a: 1,, b: 2}',
+    ''
+])
+def test_snbt_errors(text):
+    with pytest.raises(NBTException):
+        snbt.loads(text)
+
+
+@pytest.mark.parametrize('text', [
+    '[13, 1]',
+    '[0, null]',
+    '[5, "1.5"]',
+    '[9, [42, [1]]]'
+])
+def test_json_errors(text):
+    with pytest.raises(NBTException):
+        snbt.loads_json(text)
+
+
+def test_convert_rejects_non_compound():
+    with pytest.raises(NBTException):
+        snbt.convert(BytesIO(b'\x03\x00\x00\x00\x00\x00\x01'), StringIO())
@@ -0,0 +1,47 @@
+import json
+
+from collections import Counter
+
+from yonbt import ChunkState, RegionFile, Stats
+from yonbt.nbt import TAG_Compound, TAG_Int
+
+
+def level(value):
+    return {'Level': TAG_Compound('Level', {'Value': TAG_Int('Value', value)})}
+
+
+def test_region_roundtrip(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.0.0.mca', {(0, 0): level(1), (3, 7): level(2)})
+    calls = []
+    stats = Stats(callback=lambda *args: calls.append(args))
+
+    region = RegionFile(str(path), stats=stats)
+    # the state property would encode the chunks
+    assert stats.chunks_decoded == Counter(c._state for c in region.values())
+    assert stats.chunks_decoded[ChunkState.OK] == 2
+    assert stats.tags['TAG_Int'] == 2
+    assert set(stats.times) == {'read', 'decompress', 'parse'}
+    assert stats.calls['decompress'] == stats.calls['parse'] == 2
+    assert stats.bytes_out['read'] == path.stat().st_size
+
+    region[3, 7]['Level']['Value'].value = 3
+    region.save()
+    assert {'serialize', 'compress', 'write'} <= set(stats.times)
+    assert stats.chunks_encoded == Counter(c._state for c in region.values())
+    assert stats.bytes_in['write'] == path.stat().st_size
+
+    # every recorded phase was passed on with its byte counts
+    assert [phase for phase, *_ in calls].count('decompress') == 2
+    for phase, seconds, bytes_in, bytes_out in calls:
+        assert seconds >= 0
+        if phase in ('decompress', 'compress'):
+            assert bytes_in > 0 and bytes_out > 0
+    assert sum(c[3] for c in calls if c[0] == 'read') == stats.bytes_out['read']
+
+    d = json.loads(json.dumps(stats.as_dict()))
+    assert d['phases']['read']['calls'] == 1
+    assert d['chunks_decoded'] == {state.name: n for state, n in stats.chunks_decoded.items()}
+    assert str(stats)
+
+    stats.reset()
+    assert not stats.times and not stats.chunks_decoded
@@ -0,0 +1,104 @@
+import mmap
+import os
+import pickle
+
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from yonbt import RegionFile
+from yonbt.nbt import TAG_Byte_Array, TAG_Compound
+from yonbt.region import SECTOR_LEN
+from yonbt.view import ChunkCache, RegionView
+
+from conftest import encoded
+
+
+REGION = '/home/nbt/world/region/r.0.0.mca'
+
+
+def test_stale_entries_are_replaced(tmp_path):
+    cache = ChunkCache(tmp_path)
+    cache.put(REGION, 1, 2, 5, 100, b'old')
+    assert bytes(cache.get(REGION, 1, 2, 5, 100)) == b'old'
+
+    cache.put(REGION, 1, 2, 5, 200, b'new')
+    assert cache.get(REGION, 1, 2, 5, 100) is None
+    assert bytes(cache.get(REGION, 1, 2, 5, 200)) == b'new'
+    assert cache.get(REGION, 1, 2, 6, 200) is None
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_missing_entry(tmp_path):
+    assert ChunkCache(tmp_path).get(REGION, 0, 0, 2, 1) is None
+
+
+def test_size_limit(tmp_path):
+    cache = ChunkCache(tmp_path, max_size=64 * 1024)
+    for i in range(64):
+        cache.put(REGION, i % 32, i // 32, 2, 1, b'\x00' * 4096)
+    total = sum(entry.stat().st_size for entry in tmp_path.iterdir())
+    assert total <= 64 * 1024
+    # the most recent entry is kept
+    assert cache.get(REGION, 31, 1, 2, 1) is not None
+
+
+def test_clear(tmp_path):
+    cache = ChunkCache(tmp_path)
+    cache.put(REGION, 0, 0, 2, 1, b'data')
+    cache.clear()
+    assert not list(tmp_path.iterdir())
+
+
+def level(data):
+    return {'Level': TAG_Compound('Level', {'Data': TAG_Byte_Array('Data', bytearray(data))})}
+
+
+def payload_in_worker(view, key):
+    return bytes(view.payload(key))
+
+
+def test_region_view(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.1.-1.mca', {(0, 0): level(b'a'), (5, 9): level(b'b')}, coords=(1, -1))
+    region = RegionFile(str(path))
+    cache = ChunkCache(tmp_path / 'cache')
+
+    with RegionView(str(path), cache) as view:
+        assert len(view) == 1024
+        # not cached yet
+        assert not isinstance(view.payload((5, 9)), mmap.mmap)
+        for key in ((0, 0), (5, 9)):
+            assert encoded(view[key]) == encoded(region[key])
+            assert view.timestamp(key) == region[key]._timestamp
+        # in-world coordinates
+        assert encoded(view[37, -23]) == encoded(region[5, 9])
+        assert view.payload((1, 1)) is None
+        assert not hasattr(view[1, 1], '_value')
+        with pytest.raises(KeyError):
+            view[0, 40]
+
+    # a second view reads the decompressed data from the cache
+    with RegionView(str(path), cache) as view:
+        assert isinstance(view.payload((5, 9)), mmap.mmap)
+        assert encoded(view[5, 9]) == encoded(region[5, 9])
+
+    # rewritten with more data, the chunk gets a new location and is not served stale
+    data = os.urandom(3 * SECTOR_LEN)
+    write_region(path, {(0, 0): level(b'a'), (5, 9): level(data)}, coords=(1, -1))
+    with RegionView(str(path), cache) as view:
+        assert not isinstance(view.payload((5, 9)), mmap.mmap)
+        assert view[5, 9]['Level']['Data'].value == bytearray(data)
+
+
+def test_region_view_pickling(tmp_path, write_region):
+    path = write_region(tmp_path / 'r.0.0.mca', {(2, 3): level(b'chunk')})
+    cache = ChunkCache(tmp_path / 'cache')
+    with RegionView(str(path), cache) as view:
+        expected = bytes(view.payload((2, 3)))
+        loaded = pickle.loads(pickle.dumps(view))
+        assert loaded.cache.directory == cache.directory
+        assert encoded(loaded[2, 3]) == encoded(view[2, 3])
+        loaded.close()
+
+        with ProcessPoolExecutor(1) as pool:
+            assert pool.submit(payload_in_worker, view, (2, 3)).result() == expected
@@ -1,8 +1,12 @@
-from .files import NBTFile, RegionFile
-from .region import Chunk, Region
+from .files import NBTFile, RegionFile, load_area
+from .region import Chunk, Region, ChunkState, Compression
 from .nbt import TAG_Byte, TAG_Short, TAG_Int, TAG_Long, TAG_Float, TAG_Double, \
     TAG_Byte_Array, TAG_String, TAG_List, TAG_Compound, TAG_Int_Array, TAG_Long_Array, NBTObj
-from .utils import locateBlock, locateChunk, chunkByBlock
+from .utils import locateBlock, locateChunk, chunkByBlock, chunksInArea
+from .stats import Stats
+from .index import WorldIndex
+from .view import RegionView, ChunkCache
+from .query import Query
 import logging
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
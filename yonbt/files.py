@@ -1,59 +1,104 @@
 import gzip
 import logging
 import re
+import zlib
+from io import BytesIO
 from pathlib import Path
+
+from struct import unpack
+
+from typing import Iterator, Optional, Tuple
+
 from .nbt import NBTObj
-from .region import Region
+from .region import Chunk, ChunkState, Compression, Coordinates, Region, SECTOR_LEN, external_filename
+from .stats import Stats
+from .utils import chunkByBlock, chunksInArea
 
 log = logging.getLogger(__name__)
 
 
+def _detect_compression(raw) -> Compression:
+    if raw[:2] == b'\x1f\x8b':
+        return Compression.GZIP
+    # zlib streams start with a CMF byte of 0x78 (deflate, 32K window)
+    # and a FLG byte making the first two bytes a multiple of 31,
+    # uncompressed NBT always starts with a compound tag (0x0a)
+    if len(raw) > 1 and raw[0] == 0x78 and (raw[0] << 8 | raw[1]) % 31 == 0:
+        return Compression.ZLIB
+    return Compression.NONE
+
+
 class NBTFile(NBTObj):
     def __init__(self, filename):
         self.filename = filename
-        try:
-            with gzip.open(self.filename, 'rb') as io:
-                super().__init__(io=io)
-            self.compression = 'GZIP'
-            log.info(f'{self.filename} was GZIP compressed.')
-        except IOError:
-            with open(self.filename, 'rb') as io:
-                super().__init__(io=io)
-            self.compression = 'NONE'
-            log.info(f'{self.filename} was not compressed.')
+        with open(self.filename, 'rb') as f:
+            raw = f.read()
+
+        self.compression = _detect_compression(raw)
+        if self.compression is Compression.GZIP:
+            raw = gzip.decompress(raw)
+        elif self.compression is Compression.ZLIB:
+            raw = zlib.decompress(raw)
+        log.info(f'{self.filename} was {self.compression.name} compressed.')
+
+        with BytesIO(raw) as io:
+            super().__init__(io=io)
 
     def save(self, destfile=None):
         if destfile is None:
             destfile = self.filename
             log.info('No save destination specified.')
-        if self.compression == 'GZIP':
-            with gzip.open(destfile, 'wb') as io:
-                self.saveNBT(io)
-            log.info(f'GZIP compression applied to \"{destfile}\".')
-        elif self.compression == 'NONE':
-            with open(destfile, 'wb') as io:
-                self.saveNBT(io)
-            log.info(f'No compression applied to \"{destfile}\".')
+        # compression used to be given as 'GZIP' or 'NONE'
+        if isinstance(self.compression, str):
+            try:
+                self.compression = Compression[self.compression.upper()]
+            except KeyError:
+                raise ValueError(f'Unknown compression: {self.compression}') from None
+        with BytesIO() as io:
+            self.saveNBT(io)
+            raw = io.getvalue()
+        if self.compression is Compression.GZIP:
+            raw = gzip.compress(raw)
+        elif self.compression is Compression.ZLIB:
+            raw = zlib.compress(raw)
+        with open(destfile, 'wb') as f:
+            f.write(raw)
+        log.info(f'{self.compression.name} compression applied to \"{destfile}\".')
+
+
+_regionName = re.compile(r'r\.(?P<x>-?\d+)\.(?P<z>-?\d+)(?=\.mca)')
+
+
+def _parse_region_name(filename) -> Optional[Tuple[int, int]]:
+    """Returns the region coordinates given by a region filename, or None if it is not one."""
+    n = _regionName.search(Path(filename).name)
+    if n is None:
+        return None
+    return int(n.group('x')), int(n.group('z'))
+
+
+def _region_coords(filename) -> Tuple[int, int]:
+    coords = _parse_region_name(filename)
+    if coords is None:
+        log.warning('Invalid region filename!')
+        return 0, 0
+    return coords
 
 
 class RegionFile(Region):
-    def __init__(self, filename):
+    def __init__(self, filename, stats=None):
         self.filename = filename
-        if isinstance(filename, Path):
-            tn = filename.name
-        else:
-            tn = filename
-
-        n = re.search('r\.(?P<x>-?.+)\.(?P<z>-?.+)(?=\.mca)', tn)
-        if n is None:
-            log.warning('Invalid region filename!')
-            coords = 0, 0
-        else:
-            coords = int(n.group('x')), int(n.group('z'))
+        coords = _region_coords(filename)
 
-        super().__init__(coords)
-        with open(self.filename, 'rb') as io:
-            self.decode_region(io)
+        super().__init__(coords, stats=stats)
+        if stats is not None:
+            start = stats.start()
+        with open(self.filename, 'rb') as f:
+            raw = f.read()
+        if stats is not None:
+            stats.record('read', start, bytes_out=len(raw))
+        with BytesIO(raw) as io:
+            self.decode_region(io, Path(self.filename).parent)
 
         log.debug(f'Loaded \"{self.filename}\" as Region{coords}')
 
@@ -66,7 +111,113 @@ class RegionFile(Region):
                 log.warning('Invalid region filename!'
                             ' Minecraft will not be able to read this file!')
 
-        with open(destfile, 'wb') as io:
-            self.encode_region(io)
+        external = {}
+        with BytesIO() as io:
+            self.encode_region(io, external)
+            raw = io.getvalue()
+        if self.stats is not None:
+            start = self.stats.start()
+        # oversized chunks are written first and stale files deleted last,
+        # so the region never references missing files
+        directory = Path(destfile).parent
+        for name, data in external.items():
+            if data is not None:
+                with open(directory / name, 'wb') as f:
+                    f.write(data)
+                log.debug(f'Saved oversized chunk to \"{directory / name}\"')
+        with open(destfile, 'wb') as f:
+            f.write(raw)
+        for name, data in external.items():
+            if data is None:
+                try:
+                    (directory / name).unlink()
+                except FileNotFoundError:
+                    pass
+        if self.stats is not None:
+            self.stats.record('write', start, bytes_in=len(raw) + sum(len(d) for d in external.values() if d))
 
         log.debug(f'Saved Region to \"{destfile}\"')
+
+
+class _HeaderedIO:
+    """File-like access to a region file, with its header held in memory.
+
+    Decoding a chunk reads its header entry before its data, so seeking back
+    and forth within the file is avoided; only the chunks' data is read from it.
+    """
+
+    def __init__(self, f, header: bytes):
+        self.f = f
+        self.header = header
+        self.size = f.seek(0, 2)
+        self.pos = 0
+
+    def seek(self, pos: int, whence=0) -> int:
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += self.size
+        self.pos = pos
+        return pos
+
+    def read(self, size=-1) -> bytes:
+        if self.pos + size <= len(self.header) and size >= 0:
+            data = self.header[self.pos:self.pos + size]
+        else:
+            self.f.seek(self.pos)
+            data = self.f.read(size)
+        self.pos += len(data)
+        return data
+
+
+def load_area(directory, x1: int, z1: int, x2: int, z2: int, blocks=False,
+              stats: Optional[Stats] = None) -> Iterator[Tuple[Coordinates, Chunk]]:
+    """Loads all chunks within an area of the world.
+
+    Only the region files overlapping the area are opened, and of those only
+    the chunks inside the area are read, in the order they are stored in,
+    so reads stay sequential. Regions and chunks that don't exist are skipped.
+
+    Parameters
+    ----------
+    directory : str or Path
+        directory containing the region files
+    x1, z1, x2, z2 : int
+        in-world coordinates of two opposite corners of the area, inclusive
+    blocks : bool
+        whether the corners are given as block instead of chunk coordinates
+    stats : Stats, optional
+        collects timings of decoding the chunks
+
+    Yields
+    ------
+    tuple
+        the in-world coordinates and the decoded `Chunk`
+    """
+    if blocks:
+        x1, z1 = chunkByBlock(x1, z1)
+        x2, z2 = chunkByBlock(x2, z2)
+    directory = Path(directory)
+
+    for (rx, rz), keys in sorted(chunksInArea(x1, z1, x2, z2).items()):
+        path = directory / f'r.{rx}.{rz}.mca'
+        if not path.is_file():
+            log.debug(f'Region {rx, rz} does not exist, skipping')
+            continue
+
+        with open(path, 'rb') as f:
+            header = f.read(SECTOR_LEN * 2)
+            if len(header) < SECTOR_LEN * 2:
+                log.warning(f'\"{path}\" does not contain a header, skipping')
+                continue
+            locations = unpack('>1024I', header[:SECTOR_LEN])
+            io = _HeaderedIO(f, header)
+
+            for x, z in sorted((k for k in keys if locations[k[0] + k[1] * 32]),
+                               key=lambda k: locations[k[0] + k[1] * 32]):
+                world = Coordinates(rx * 32 + x, rz * 32 + z)
+                chunk = Chunk(x, z)
+                chunk._stats = stats
+                chunk.decode_chunk(io, directory / external_filename(*world))
+                if chunk._state in (ChunkState.OK, ChunkState.OVERLAPPING) and hasattr(chunk, '_value'):
+                    yield world, chunk
@@ -0,0 +1,293 @@
+import logging
+import sqlite3
+
+from io import BytesIO
+from pathlib import Path
+from struct import pack, unpack
+from uuid import UUID
+
+from typing import NamedTuple, Optional, List, Dict, Tuple
+
+from .files import _parse_region_name
+from .region import Chunk, ChunkState, Coordinates, SECTOR_LEN, external_filename
+
+log = logging.getLogger(__name__)
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS regions (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    region INTEGER NOT NULL,
+    x INTEGER NOT NULL,
+    z INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    PRIMARY KEY (region, x, z)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    region INTEGER NOT NULL,
+    cx INTEGER NOT NULL,
+    cz INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    tag_id TEXT,
+    x REAL,
+    y REAL,
+    z REAL,
+    uuid TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    entry INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    count INTEGER
+);
+CREATE INDEX IF NOT EXISTS entries_chunk ON entries (region, cx, cz);
+CREATE INDEX IF NOT EXISTS entries_tag_id ON entries (tag_id);
+CREATE INDEX IF NOT EXISTS entries_uuid ON entries (uuid);
+CREATE INDEX IF NOT EXISTS items_entry ON items (entry);
+CREATE INDEX IF NOT EXISTS items_item_id ON items (item_id);
+'''
+
+ENTITY = 0
+TILE_ENTITY = 1
+
+
+class Entry(NamedTuple):
+    kind: int
+    id: Optional[str]
+    x: Optional[float]
+    y: Optional[float]
+    z: Optional[float]
+    uuid: Optional[str]
+    region: str
+    chunk: Coordinates
+
+
+def _value(compound, key):
+    t = compound.get(key)
+    return None if t is None else t.value
+
+
+def _uuid(compound) -> Optional[str]:
+    ints = _value(compound, 'UUID')
+    if ints is not None and len(ints) == 4:
+        return str(UUID(bytes=pack('>4i', *ints)))
+    most, least = _value(compound, 'UUIDMost'), _value(compound, 'UUIDLeast')
+    if most is not None and least is not None:
+        return str(UUID(bytes=pack('>qq', most, least)))
+    return None
+
+
+def _items(compound) -> List[Tuple[str, int]]:
+    items = []
+    tags = list(compound.get('Items', ()))
+    if 'Item' in compound:
+        tags.append(compound['Item'])
+    for i in tags:
+        item_id = _value(i, 'id')
+        if item_id is not None:
+            items.append((item_id, _value(i, 'Count')))
+    return items
+
+
+def _summarize(chunk: Chunk):
+    """Yields (kind, id, x, y, z, uuid, items) for all entities and tile entities.
+
+    Handles both the old layout, with everything inside ``Level``,
+    and the newer one with ``block_entities`` at the top level and
+    entities in separate region files.
+    """
+    level = chunk['Level'] if 'Level' in chunk else chunk
+
+    for e in level.get('Entities', ()):
+        pos = _value(e, 'Pos')
+        x, y, z = (p.value for p in pos) if pos is not None and len(pos) == 3 else (None, None, None)
+        yield ENTITY, _value(e, 'id'), x, y, z, _uuid(e), _items(e)
+
+    for key in ('TileEntities', 'block_entities'):
+        for t in level.get(key, ()):
+            yield TILE_ENTITY, _value(t, 'id'), _value(t, 'x'), _value(t, 'y'), _value(t, 'z'), None, _items(t)
+
+
+class WorldIndex:
+    """Persistent SQLite index of entities and tile entities in region files.
+
+    Every indexed chunk is stored with the timestamp from its region header,
+    so `update` only decodes chunks that changed since the last run.
+
+    Parameters
+    ----------
+    path : str or Path
+        the index file, created if it does not exist
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(str(path))
+        self.db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _region_id(self, path: str) -> int:
+        row = self.db.execute('SELECT id FROM regions WHERE path = ?', (path,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self.db.execute('INSERT INTO regions (path) VALUES (?)', (path,)).lastrowid
+
+    def _clear_chunk(self, region: int, cx: int, cz: int) -> None:
+        self.db.execute('DELETE FROM items WHERE entry IN '
+                        '(SELECT id FROM entries WHERE region = ? AND cx = ? AND cz = ?)',
+                        (region, cx, cz))
+        self.db.execute('DELETE FROM entries WHERE region = ? AND cx = ? AND cz = ?',
+                        (region, cx, cz))
+
+    def _forget_region(self, region: int) -> None:
+        self.db.execute('DELETE FROM items WHERE entry IN '
+                        '(SELECT id FROM entries WHERE region = ?)', (region,))
+        self.db.execute('DELETE FROM entries WHERE region = ?', (region,))
+        self.db.execute('DELETE FROM chunks WHERE region = ?', (region,))
+        self.db.execute('DELETE FROM regions WHERE id = ?', (region,))
+
+    def update_region(self, path) -> int:
+        """Re-indexes all chunks of a region file whose timestamp changed.
+
+        Returns
+        -------
+        int
+            the number of decoded chunks
+        """
+        path = Path(path).resolve()
+        coords = _parse_region_name(path)
+        if coords is None:
+            log.warning(f'\"{path}\" is not a valid region filename, skipping')
+            return 0
+        rx, rz = coords
+
+        with open(path, 'rb') as f:
+            header = f.read(SECTOR_LEN * 2)
+            if len(header) < SECTOR_LEN * 2:
+                log.warning(f'{path} does not contain a header, skipping')
+                return 0
+            locations = unpack('>1024I', header[:SECTOR_LEN])
+            timestamps = unpack('>1024I', header[SECTOR_LEN:])
+
+            with self.db:
+                region = self._region_id(str(path))
+                known: Dict[Tuple[int, int], int] = {
+                    (x, z): ts for x, z, ts in
+                    self.db.execute('SELECT x, z, timestamp FROM chunks WHERE region = ?', (region,))
+                }
+
+                changed = []
+                for x in range(32):
+                    for z in range(32):
+                        i = x + z * 32
+                        if locations[i] == 0:
+                            if (x, z) in known:
+                                self._clear_chunk(region, rx * 32 + x, rz * 32 + z)
+                                self.db.execute('DELETE FROM chunks WHERE region = ? AND x = ? AND z = ?',
+                                                (region, x, z))
+                        elif known.get((x, z)) != timestamps[i]:
+                            changed.append((x, z))
+
+                if not changed:
+                    return 0
+
+                f.seek(0)
+                io = BytesIO(f.read())
+
+                for x, z in changed:
+                    cx, cz = rx * 32 + x, rz * 32 + z
+                    self._clear_chunk(region, cx, cz)
+
+                    chunk = Chunk(x, z)
+                    chunk.decode_chunk(io, path.parent / external_filename(cx, cz))
+                    if chunk._state in (ChunkState.OK, ChunkState.OVERLAPPING) and hasattr(chunk, 'value'):
+                        for kind, tag_id, ex, ey, ez, uuid, items in _summarize(chunk):
+                            entry = self.db.execute(
+                                'INSERT INTO entries (region, cx, cz, kind, tag_id, x, y, z, uuid) '
+                                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                (region, cx, cz, kind, tag_id, ex, ey, ez, uuid)
+                            ).lastrowid
+                            if items:
+                                self.db.executemany('INSERT INTO items (entry, item_id, count) VALUES (?, ?, ?)',
+                                                    [(entry, item_id, count) for item_id, count in items])
+
+                    self.db.execute('INSERT OR REPLACE INTO chunks (region, x, z, timestamp) VALUES (?, ?, ?, ?)',
+                                    (region, x, z, timestamps[x + z * 32]))
+
+        log.info(f'Re-indexed {len(changed)} chunks of {path}')
+        return len(changed)
+
+    def update(self, directory) -> int:
+        """Indexes all region files found in ``directory`` and its subdirectories.
+
+        Regions that were indexed before, but no longer exist, are removed.
+
+        Returns
+        -------
+        int
+            the number of decoded chunks
+        """
+        directory = Path(directory).resolve()
+        found = set()
+        decoded = 0
+        for path in sorted(directory.rglob('r.*.*.mca')):
+            found.add(str(path.resolve()))
+            decoded += self.update_region(path)
+
+        with self.db:
+            for region, path in self.db.execute('SELECT id, path FROM regions').fetchall():
+                if path not in found and directory in Path(path).parents:
+                    self._forget_region(region)
+
+        return decoded
+
+    def find(self, id: Optional[str] = None, uuid: Optional[str] = None,
+             item: Optional[str] = None, kind: Optional[int] = None) -> List[Entry]:
+        """Finds indexed entities and tile entities.
+
+        All given criteria must match, e.g. ``find(id='minecraft:chest', item='minecraft:diamond')``
+        returns all chests containing diamonds.
+
+        Parameters
+        ----------
+        id : str, optional
+            entity or tile entity id, e.g. ``minecraft:zombie``
+        uuid : str, optional
+            entity UUID in its usual string representation
+        item : str, optional
+            id of an item contained in the entity or tile entity
+        kind : int, optional
+            either ``ENTITY`` or ``TILE_ENTITY``
+        """
+        where, args = [], []
+        if id is not None:
+            where.append('e.tag_id = ?')
+            args.append(id)
+        if uuid is not None:
+            where.append('e.uuid = ?')
+            args.append(str(UUID(uuid)))
+        if item is not None:
+            where.append('e.id IN (SELECT entry FROM items WHERE item_id = ?)')
+            args.append(item)
+        if kind is not None:
+            where.append('e.kind = ?')
+            args.append(kind)
+
+        query = ('SELECT e.kind, e.tag_id, e.x, e.y, e.z, e.uuid, r.path, e.cx, e.cz '
+                 'FROM entries e JOIN regions r ON e.region = r.id')
+        if where:
+            query += ' WHERE ' + ' AND '.join(where)
+
+        return [Entry(*row[:7], Coordinates(row[7], row[8]))
+                for row in self.db.execute(query, args)]
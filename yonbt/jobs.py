@@ -0,0 +1,184 @@
+import logging
+import os
+import time
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from io import BytesIO
+from pathlib import Path
+
+from typing import Callable, NamedTuple, Optional, Tuple, List
+
+from .files import RegionFile, _parse_region_name
+from .region import Chunk, ChunkState
+
+log = logging.getLogger(__name__)
+
+
+TMP_SUFFIX = '.tmp'
+
+
+class Progress(NamedTuple):
+    regions_done: int
+    regions_total: int
+    chunks: int
+    modified_chunks: int
+    elapsed: float
+
+    @property
+    def chunks_per_second(self) -> float:
+        return self.chunks / self.elapsed if self.elapsed else 0.0
+
+
+class JobResult(NamedTuple):
+    regions: int
+    modified_regions: int
+    chunks: int
+    modified_chunks: int
+    elapsed: float
+
+
+def _tmp_path(path: Path) -> Path:
+    return path.with_name(path.name + TMP_SUFFIX)
+
+
+def _process_region(path: str, transform: Callable[[Chunk], bool]) \
+        -> Tuple[int, int, List[Tuple[Optional[str], str]]]:
+    """Applies ``transform`` to every chunk of a region.
+
+    If any chunk was modified the region, and the files of its oversized
+    chunks, are written to temporary files next to the originals, which
+    are left untouched.
+
+    Returns
+    -------
+    tuple
+        the number of chunks, modified chunks and the (temporary file, target)
+        pairs to commit; a temporary file of None means the target is deleted
+    """
+    region = RegionFile(path)
+    chunks = modified = 0
+    for chunk in region.values():
+        if chunk._state not in (ChunkState.OK, ChunkState.OVERLAPPING) or not hasattr(chunk, 'value'):
+            continue
+        chunks += 1
+        if transform(chunk):
+            modified += 1
+
+    if not modified:
+        return chunks, 0, []
+
+    path = Path(path)
+    external = {}
+    with BytesIO() as io:
+        region.encode_region(io, external)
+        raw = io.getvalue()
+
+    # oversized chunks come first and deletions last,
+    # so the region never references missing files
+    commits = []
+    for name, data in external.items():
+        if data is not None:
+            commits.append((_write_tmp(path.with_name(name), data), str(path.with_name(name))))
+    commits.append((_write_tmp(path, raw), str(path)))
+    for name, data in external.items():
+        if data is None:
+            commits.append((None, str(path.with_name(name))))
+    return chunks, modified, commits
+
+
+def _write_tmp(path: Path, data: bytes) -> str:
+    tmp = _tmp_path(path)
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return str(tmp)
+
+
+def run(directory, transform: Callable[[Chunk], bool], workers: Optional[int] = None,
+        progress: Optional[Callable[[Progress], None]] = None) -> JobResult:
+    """Applies a transform to every chunk of every region file in ``directory``.
+
+    Regions are processed in parallel by a pool of worker processes. Each
+    region with at least one modified chunk is written to a temporary file,
+    and only once all regions have been processed successfully, these
+    replace their originals via atomic renames. If anything fails, all
+    temporary files are removed and the world is left unchanged.
+
+    Parameters
+    ----------
+    directory : str or Path
+        directory containing the region files, files not named
+        like region files are skipped
+    transform : callable
+        called with each generated `Chunk`, must return True if it modified
+        the chunk; has to be picklable, i.e. a module level function
+    workers : int, optional
+        number of worker processes, defaults to the number of CPUs;
+        0 processes all regions in the calling process
+    progress : callable, optional
+        called with a `Progress` after every processed region
+
+    Returns
+    -------
+    JobResult
+        totals of the job
+    """
+    paths = []
+    for path in sorted(Path(directory).glob('r.*.*.mca')):
+        if _parse_region_name(path) is None:
+            log.warning(f'\"{path}\" is not a valid region filename, skipping')
+            continue
+        paths.append(path)
+    start = time.perf_counter()
+    done = chunks = modified_chunks = 0
+    pending = []
+
+    def _collect(result):
+        nonlocal done, chunks, modified_chunks
+        c, m, commits = result
+        done += 1
+        chunks += c
+        modified_chunks += m
+        if commits:
+            pending.append(commits)
+        if progress is not None:
+            progress(Progress(done, len(paths), chunks, modified_chunks, time.perf_counter() - start))
+
+    try:
+        if workers == 0:
+            for path in paths:
+                _collect(_process_region(str(path), transform))
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                futures = [pool.submit(_process_region, str(path), transform) for path in paths]
+                try:
+                    for future in as_completed(futures):
+                        _collect(future.result())
+                except BaseException:
+                    for future in futures:
+                        future.cancel()
+                    raise
+    except BaseException:
+        log.error('Job failed, discarding all changes')
+        tmps = {_tmp_path(path) for path in paths}
+        tmps.update(Path(directory).glob('c.*.*.mcc' + TMP_SUFFIX))
+        for tmp in tmps:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+        raise
+
+    for commits in pending:
+        for tmp, path in commits:
+            if tmp is None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            else:
+                os.replace(tmp, path)
+    log.info(f'Committed {len(pending)} modified regions')
+
+    return JobResult(len(paths), len(pending), chunks, modified_chunks, time.perf_counter() - start)
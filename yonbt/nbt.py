@@ -1,4 +1,6 @@
-from struct import pack, unpack
+import zlib
+
+from struct import Struct, calcsize, pack, unpack, unpack_from
 from struct import error as structerror
 from collections.abc import MutableMapping, MutableSequence
 
@@ -23,12 +25,49 @@ class TAG:
     def decode_name(self, io):
         return decode_modified_utf8(io.read(unpack(">H", io.read(2))[0]))
 
+    def clone(self):
+        new = object.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        return new
+
     def __repr__(self):
         return f'{tagNames[self.__class__.__name__]}: ' + \
             (f'{self.name}: ' if self.name else '') + f'{self.value}'
 
 
-class SequenceTAG(MutableSequence):
+class CopyOnWriteTAG:
+    """Base for tags holding a mutable value, i.e. containers and arrays.
+
+    `clone` of an array shares its list (or bytearray) between the original
+    and the clone, until either of them accesses it through `value` (and
+    might modify it), at which point that one gets its own copy; the tags
+    themselves stay where they are. Containers are cloned right away, each
+    child being cloned in turn, as a clone has to be independent of tags
+    referenced from outside before cloning, which cannot be tracked.
+    Arrays hold the bulk of the data of most trees, so cloning stays cheap.
+    """
+    _shared = False
+
+    @property
+    def value(self):
+        if self._shared:
+            self._value = self._value.copy()
+            self._shared = False
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self._shared = False
+
+    def clone(self):
+        new = object.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._shared = self._shared = True
+        return new
+
+
+class SequenceTAG(CopyOnWriteTAG, MutableSequence):
     def __init__(self, value):
         self.value = value
 
@@ -42,13 +81,13 @@ class SequenceTAG(MutableSequence):
         del self.value[index]
 
     def __len__(self):
-        return len(self.value)
+        return len(self._value)
 
     def insert(self, index, value):
         self.value.insert(index, value)
 
     def __repr__(self):
-        length = len(self.value)
+        length = len(self._value)
         return f'{tagNames[self.__class__.__name__]}: ' + \
                (f'{self.name}: ' if self.name else '') + \
                (f'{length} Entry' if length == 1 else f'{length} Entries')
@@ -154,7 +193,7 @@ class TAG_Double(TAG):
         self.encode(io, 'd', self.value)
 
 
-class TAG_Byte_Array(TAG):
+class TAG_Byte_Array(CopyOnWriteTAG, TAG):
     def __init__(self, name=None, value=None, io=None):
         self.name = name
         if io is None:
@@ -167,17 +206,17 @@ class TAG_Byte_Array(TAG):
             self.encode(io, 'b', 7)
         if self.name is not None:
             self.encode_name(io)
-        self.encode(io, 'i', len(self.value))
-        io.write(self.value)
+        self.encode(io, 'i', len(self._value))
+        io.write(self._value)
 
     def __repr__(self):
-        length = len(self.value)
+        length = len(self._value)
         return f'{tagNames[self.__class__.__name__]}: ' + \
                (f'{self.name}: ' if self.name else '') + \
                (f'{length} Entry' if length == 1 else f'{length} Entries')
 
     def __str__(self):
-        return repr(self) + '[\n\t' + self.value.hex(' ') + '\n]'
+        return repr(self) + '[\n\t' + self._value.hex(' ') + '\n]'
 
 
 class TAG_String(TAG):
@@ -205,31 +244,36 @@ class TAG_List(SequenceTAG, TAG):
             super().__init__(value)
             self.tags_type = tags_type
         else:
-            super().__init__([])
             self.tags_type = self.decode(io, 'b', 1)[0]
-            for _ in range(self.decode(io, 'i', 4)[0]):
-                self.value.append(tag[self.tags_type](io=io))
+            tagClass = tag[self.tags_type]
+            super().__init__([tagClass(io=io) for _ in range(self.decode(io, 'i', 4)[0])])
+
+    def clone(self):
+        new = object.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._value = [i.clone() for i in self._value]
+        return new
 
     def saveNBT(self, io, typed=True):
         if typed:
             self.encode(io, 'b', 9)
         if self.name is not None:
             self.encode_name(io)
-        if len(self.value) > 0:
+        if len(self._value) > 0:
             self.encode(io, 'b', self.tags_type)
-            self.encode(io, 'i', len(self.value))
-            for i in self.value:
+            self.encode(io, 'i', len(self._value))
+            for i in self._value:
                 i.saveNBT(io, typed=False)
         else:
             self.encode(io, 'b', 0)
             self.encode(io, 'i', 0)
 
     def __str__(self):
-        return repr(self) + '{\n\t' + '\n\t'.join([f'[{idx}] {repr(tag)}' for idx, tag in enumerate(self.value)]) + '\n}'
+        return repr(self) + '{\n\t' + '\n\t'.join([f'[{idx}] {repr(tag)}' for idx, tag in enumerate(self._value)]) + '\n}'
 
     def pretty(self, indent=0):
         rep = []
-        for v in self.value:
+        for v in self._value:
             if isinstance(v, TAG_Compound):
                 rep.append('\t' * indent + '{')
                 rep.extend(v.pretty(indent=indent + 1))
@@ -247,26 +291,34 @@ class TAG_List(SequenceTAG, TAG):
             print(s)
 
 
-class TAG_Compound(MutableMapping, TAG):
+class TAG_Compound(CopyOnWriteTAG, MutableMapping, TAG):
     def __init__(self, name=None, value=None, io=None):
         self.name = name
         if io is None:
             self.value = value
         else:
-            self.value = {}
+            self.value = value = {}
             while True:
                 typeID = self.decode(io, 'b', 1)[0]
                 if typeID == 0:
                     break
                 tagName = self.decode_name(io)
-                self.value[tagName] = tag[typeID](name=tagName, io=io)
+                value[tagName] = tag[typeID](name=tagName, io=io)
+
+    def clone(self):
+        # reading _value first decodes a lazily unpickled NBTObj
+        value = {k: v.clone() for k, v in self._value.items()}
+        new = object.__new__(self.__class__)
+        new.__dict__.update(self.__dict__)
+        new._value = value
+        return new
 
     def saveNBT(self, io, typed=True):
         if typed:
             self.encode(io, 'b', 10)
         if self.name is not None:
             self.encode_name(io)
-        for i in self.value.values():
+        for i in self._value.values():
             i.saveNBT(io)
         self.encode(io, 'b', 0)
 
@@ -280,13 +332,13 @@ class TAG_Compound(MutableMapping, TAG):
         del self.value[key]
 
     def __iter__(self):
-        return iter(self.value)
+        return iter(self._value)
 
     def __len__(self):
-        return len(self.value)
+        return len(self._value)
 
     def __repr__(self):
-        length = len(self.value)
+        length = len(self._value)
         try:
             tagname = tagNames[self.__class__.__name__]
         except KeyError:
@@ -297,11 +349,11 @@ class TAG_Compound(MutableMapping, TAG):
                 (f'{length} Entry' if length == 1 else f'{length} Entries')
 
     def __str__(self):
-        return repr(self) + '{\n\t' + '\n\t'.join([repr(tag) for tag in self.value.values()]) + '\n}'
+        return repr(self) + '{\n\t' + '\n\t'.join([repr(tag) for tag in self._value.values()]) + '\n}'
 
     def pretty(self, indent=0):
         rep = []
-        for k, v in self.value.items():
+        for k, v in self._value.items():
             if isinstance(v, TAG_Compound):
                 rep.append('\t' * indent + str(k) + ': {')
                 rep.extend(v.pretty(indent=indent + 1))
@@ -325,21 +377,23 @@ class TAG_Int_Array(SequenceTAG, TAG):
         if io is None:
             super().__init__(value)
         else:
-            super().__init__([])
-            for _ in range(self.decode(io, 'i', 4)[0]):
-                self.value.append(self.decode(io, 'i', 4)[0])
+            length = self.decode(io, 'i', 4)[0]
+            super().__init__(list(self.decode(io, f'{length}i', length * 4)))
+
+    def __getitem__(self, index):
+        # items are plain numbers, reading them never needs a copy
+        return self._value[index]
 
     def saveNBT(self, io, typed=True):
         if typed:
             self.encode(io, 'b', 11)
         if self.name is not None:
             self.encode_name(io)
-        self.encode(io, 'i', len(self.value))
-        for i in self.value:
-            self.encode(io, 'i', i)
+        length = len(self._value)
+        self.encode(io, f'i{length}i', length, *self._value)
 
     def __str__(self):
-        return repr(self) + '[\n\t' + ' '.join(self.value) + '\n]'
+        return repr(self) + '[\n\t' + ' '.join(map(str, self._value)) + '\n]'
 
 
 class TAG_Long_Array(SequenceTAG, TAG):
@@ -348,24 +402,149 @@ class TAG_Long_Array(SequenceTAG, TAG):
         if io is None:
             super().__init__(value)
         else:
-            super().__init__([])
-            for _ in range(self.decode(io, 'i', 4)[0]):
-                self.value.append(self.decode(io, 'q', 8)[0])
+            length = self.decode(io, 'i', 4)[0]
+            super().__init__(list(self.decode(io, f'{length}q', length * 8)))
+
+    def __getitem__(self, index):
+        # items are plain numbers, reading them never needs a copy
+        return self._value[index]
 
     def saveNBT(self, io, typed=True):
         if typed:
             self.encode(io, 'b', 12)
         if self.name is not None:
             self.encode_name(io)
-        self.encode(io, 'i', len(self.value))
-        for i in self.value:
-            self.encode(io, 'q', i)
+        length = len(self._value)
+        self.encode(io, f'i{length}q', length, *self._value)
 
     def __str__(self):
-        return repr(self) + '[\n\t' + ' '.join(self.value) + '\n]'
+        return repr(self) + '[\n\t' + ' '.join(map(str, self._value)) + '\n]'
+
+
+# Buffer based encoding and decoding of a compound's content, used for pickling.
+# Per tag it skips the method calls and stream accesses of saveNBT and
+# the decoding constructors, which dominate the cost of small tags.
+
+_new = object.__new__
+_nameHeader = Struct('>bH')
+_length = Struct('>H')
+_listHeader = Struct('>bi')
+_arrayLength = Struct('>i')
+_scalarFormats = {1: 'b', 2: 'h', 3: 'i', 4: 'q', 5: 'f', 6: 'd'}
+_scalarSizes = {typeID: calcsize(fmt) for typeID, fmt in _scalarFormats.items()}
+_scalars = {
+    typeID: (cls, Struct('>' + _scalarFormats[typeID]))
+    for typeID, cls in ((1, TAG_Byte), (2, TAG_Short), (3, TAG_Int), (4, TAG_Long), (5, TAG_Float), (6, TAG_Double))
+}
+
+
+def _encode_string(s: str) -> bytes:
+    try:
+        return s.encode('ascii')
+    except UnicodeEncodeError:
+        return encode_modified_utf8(s)
+
+
+def _decode_string(buf, pos: int):
+    end = pos + 2 + _length.unpack_from(buf, pos)[0]
+    raw = bytes(buf[pos + 2:end])
+    # modified UTF-8 only differs from UTF-8 in sequences that are invalid UTF-8
+    try:
+        return raw.decode('utf-8'), end
+    except UnicodeDecodeError:
+        return decode_modified_utf8(raw), end
+
+
+def _dump_value(t, typeID: int, out: list) -> None:
+    if typeID in _scalars:
+        out.append(_scalars[typeID][1].pack(t.value))
+    elif typeID == 8:
+        raw = _encode_string(t.value)
+        out.append(_length.pack(len(raw)))
+        out.append(raw)
+    elif typeID == 10:
+        _dump_compound(t._value, out)
+    elif typeID == 9:
+        items = t._value
+        if not items:
+            out.append(_listHeader.pack(0, 0))
+        elif t.tags_type in _scalarFormats:
+            out.append(pack(f'>bi{len(items)}{_scalarFormats[t.tags_type]}',
+                            t.tags_type, len(items), *[i.value for i in items]))
+        else:
+            out.append(_listHeader.pack(t.tags_type, len(items)))
+            for i in items:
+                _dump_value(i, t.tags_type, out)
+    elif typeID == 7:
+        out.append(_arrayLength.pack(len(t._value)))
+        out.append(bytes(t._value))
+    else:
+        length = len(t._value)
+        out.append(pack(f'>i{length}{"i" if typeID == 11 else "q"}', length, *t._value))
+
+
+def _dump_compound(value: dict, out: list) -> None:
+    for t in value.values():
+        typeID = _type_id(t)
+        raw = _encode_string(t.name)
+        out.append(_nameHeader.pack(typeID, len(raw)))
+        out.append(raw)
+        _dump_value(t, typeID, out)
+    out.append(b'\x00')
+
+
+def _load_value(buf, pos: int, typeID: int, name):
+    if typeID in _scalars:
+        cls, fmt = _scalars[typeID]
+        t = _new(cls)
+        t.name = name
+        t.value = fmt.unpack_from(buf, pos)[0]
+        return t, pos + fmt.size
+    t = _new(tag[typeID])
+    t.name = name
+    if typeID == 8:
+        t.value, pos = _decode_string(buf, pos)
+    elif typeID == 10:
+        t._value, pos = _load_compound(buf, pos)
+    elif typeID == 9:
+        t.tags_type, length = _listHeader.unpack_from(buf, pos)
+        pos += 5
+        items = t._value = []
+        for _ in range(length):
+            i, pos = _load_value(buf, pos, t.tags_type, None)
+            items.append(i)
+    else:
+        length = _arrayLength.unpack_from(buf, pos)[0]
+        pos += 4
+        if typeID == 7:
+            t._value = bytearray(buf[pos:pos + length])
+            pos += length
+        elif typeID == 11:
+            t._value = list(unpack_from(f'>{length}i', buf, pos))
+            pos += 4 * length
+        elif typeID == 12:
+            t._value = list(unpack_from(f'>{length}q', buf, pos))
+            pos += 8 * length
+        else:
+            raise NBTException(f'Invalid tag type: {typeID}')
+    return t, pos
+
+
+def _load_compound(buf, pos: int):
+    value = {}
+    while True:
+        typeID = buf[pos]
+        if typeID == 0:
+            return value, pos + 1
+        name, pos = _decode_string(buf, pos + 1)
+        value[name], pos = _load_value(buf, pos, typeID, name)
 
 
 class NBTObj(TAG_Compound):
+    # zlib compression level applied to the NBT payload when pickling,
+    # None leaves it uncompressed
+    pickle_compression = None
+
     def __init__(self, io=None):
         if io is not None:
             if self.decode(io, 'b', 1)[0] != 10:
@@ -377,6 +556,42 @@ class NBTObj(TAG_Compound):
                 raise NBTException('The following struct.error was raised '
                                    f'during decoding: {e}')
 
+    def __getstate__(self):
+        """Pickles the tag tree as compact NBT bytes instead of an object graph.
+
+        Unpickled objects keep those bytes and only decode them
+        the first time their value is accessed.
+        """
+        state = self.__dict__.copy()
+        if state.get('_value') is not None:
+            del state['_value']
+            state.pop('_shared', None)
+            out = []
+            _dump_compound(self._value, out)
+            raw = b''.join(out)
+            if self.pickle_compression is None:
+                state['_nbt'] = False, raw
+            else:
+                state['_nbt'] = True, zlib.compress(raw, self.pickle_compression)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def __getattr__(self, attr):
+        # only called for missing attributes, so this costs nothing
+        # once the pickled NBT payload has been decoded
+        if attr == '_value' and '_nbt' in self.__dict__:
+            compressed, raw = self.__dict__.pop('_nbt')
+            if compressed:
+                raw = zlib.decompress(raw)
+            try:
+                self._value = _load_compound(raw, 0)[0]
+            except (structerror, IndexError, KeyError) as e:
+                raise NBTException(f'Invalid pickled NBT data: {e}')
+            return self._value
+        raise AttributeError(f"'{self.__class__.__name__}' object has no attribute '{attr}'")
+
     def pprint(self, indent=1):
         print('\t' * indent + 'BaseCompound: {\n' + '\t' * indent + '\n'.join(super().pretty(indent=indent)) + '\t' * indent + '\n}')
 
@@ -397,6 +612,21 @@ tag = {
     12: TAG_Long_Array
 }
 
+_typeIDs = {cls: typeID for typeID, cls in tag.items()}
+
+
+def _type_id(t) -> int:
+    """Returns the type id of a tag, also for subclasses such as NBTObj or Chunk."""
+    cls = t.__class__
+    try:
+        return _typeIDs[cls]
+    except KeyError:
+        for base in cls.__mro__:
+            if base in _typeIDs:
+                _typeIDs[cls] = _typeIDs[base]
+                return _typeIDs[base]
+        raise NBTException(f'{cls.__name__} is not a tag')
+
 
 tagNames = {
     'TAG_Byte': 'B',
@@ -0,0 +1,375 @@
+"""Declarative queries over chunks, evaluated on their binary NBT data.
+
+A query is made of conditions, each being a path into the chunk, an operator
+and a value, all of which have to hold for a chunk to match:
+
+    select('/home/nbt/world/region',
+           ('Level.TileEntities[].id', '==', 'minecraft:chest'),
+           ('Level.TileEntities[].Items[].id', '==', 'minecraft:diamond'))
+
+Paths are dot separated compound keys, ``[]`` selects every element
+of a list and ``[n]`` a single one; a condition holds if it holds
+for any of the values a path leads to. Conditions whose paths pass
+through the same ``[]`` have to hold for the same element of that list,
+so the example above finds chunks with a chest that contains diamonds.
+
+Chunks read from region files are scanned without decoding them into tags,
+only the paths used by the query are looked at, everything else is skipped.
+Only matching chunks are decoded.
+"""
+import logging
+import operator
+import re
+
+from io import BytesIO
+from pathlib import Path
+from struct import unpack, unpack_from
+
+from typing import Any, Iterator, NamedTuple, Tuple
+
+from mutf8 import encode_modified_utf8, decode_modified_utf8
+
+from .files import _parse_region_name, _region_coords
+from .nbt import _scalarFormats, _scalarSizes, NBTException, TAG_Compound, TAG_List
+from .region import Chunk, ChunkState, Coordinates, Region, SECTOR_LEN, external_filename
+
+log = logging.getLogger(__name__)
+
+
+def _contains(value, other):
+    return other in value
+
+
+def _in(value, other):
+    return value in other
+
+
+def _exists(value, other):
+    return True
+
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'contains': _contains,
+    'in': _in,
+    'exists': _exists
+}
+
+
+class Condition(NamedTuple):
+    path: str
+    op: str
+    value: Any = None
+
+
+# stands in for compounds and lists of containers, which only 'exists' applies to
+_CONTAINER = object()
+
+_step = re.compile(r'([^.\[\]]+)|\[(\d*)\]')
+
+
+def _parse_path(path: str):
+    steps = []
+    pos = 0
+    while pos < len(path):
+        if path[pos] == '.' and steps:
+            pos += 1
+        m = _step.match(path, pos)
+        if m is None:
+            raise ValueError(f'Invalid path: {path}')
+        if m.group(1) is not None:
+            steps.append(m.group(1))
+        else:
+            steps.append(int(m.group(2)) if m.group(2) else None)
+        pos = m.end()
+    return steps
+
+
+class _Node:
+    """One step of the merged paths of a query.
+
+    ``scope`` holds the conditions of all paths passing through it.
+    """
+    __slots__ = ('conditions', 'scope', 'keys', 'names', 'items', 'index')
+
+    def __init__(self):
+        self.conditions = []
+        self.scope = set()
+        self.keys = {}
+        self.names = {}
+        self.items = None
+        self.index = {}
+
+    def child(self, step) -> '_Node':
+        if step is None:
+            if self.items is None:
+                self.items = _Node()
+            return self.items
+        if isinstance(step, int):
+            return self.index.setdefault(step, _Node())
+        if step not in self.keys:
+            self.keys[step] = self.names[encode_modified_utf8(step)] = _Node()
+        return self.keys[step]
+
+
+def _skip(buf, pos: int, typeID: int) -> int:
+    if typeID in _scalarSizes:
+        return pos + _scalarSizes[typeID]
+    if typeID == 8:
+        return pos + 2 + unpack_from('>H', buf, pos)[0]
+    if typeID == 7:
+        return pos + 4 + unpack_from('>i', buf, pos)[0]
+    if typeID == 11:
+        return pos + 4 + 4 * unpack_from('>i', buf, pos)[0]
+    if typeID == 12:
+        return pos + 4 + 8 * unpack_from('>i', buf, pos)[0]
+    if typeID == 9:
+        tagsType, length = unpack_from('>bi', buf, pos)
+        pos += 5
+        if tagsType in _scalarSizes:
+            return pos + length * _scalarSizes[tagsType]
+        for _ in range(length):
+            pos = _skip(buf, pos, tagsType)
+        return pos
+    if typeID == 10:
+        while True:
+            childType = buf[pos]
+            pos += 1
+            if childType == 0:
+                return pos
+            pos += 2 + unpack_from('>H', buf, pos)[0]
+            pos = _skip(buf, pos, childType)
+    raise NBTException(f'Invalid tag type: {typeID}')
+
+
+def _read(buf, pos: int, typeID: int):
+    """Reads the value of a tag the same way `_tag_value` would return it."""
+    if typeID in _scalarFormats:
+        return unpack_from('>' + _scalarFormats[typeID], buf, pos)[0]
+    if typeID == 8:
+        length = unpack_from('>H', buf, pos)[0]
+        return decode_modified_utf8(bytes(buf[pos + 2:pos + 2 + length]))
+    if typeID == 7:
+        length = unpack_from('>i', buf, pos)[0]
+        return bytes(buf[pos + 4:pos + 4 + length])
+    if typeID in (11, 12):
+        length = unpack_from('>i', buf, pos)[0]
+        return list(unpack_from(f'>{length}{"i" if typeID == 11 else "q"}', buf, pos + 4))
+    if typeID == 9:
+        tagsType, length = unpack_from('>bi', buf, pos)
+        if tagsType in _scalarFormats:
+            return list(unpack_from(f'>{length}{_scalarFormats[tagsType]}', buf, pos + 5))
+        if tagsType == 8 or length == 0:
+            values = []
+            pos += 5
+            for _ in range(length):
+                values.append(_read(buf, pos, 8))
+                pos = _skip(buf, pos, 8)
+            return values
+    return _CONTAINER
+
+
+def _tag_value(t):
+    if isinstance(t, TAG_Compound):
+        return _CONTAINER
+    if isinstance(t, TAG_List):
+        if t.tags_type in _scalarFormats or t.tags_type == 8 or not t._value:
+            return [i.value for i in t._value]
+        return _CONTAINER
+    value = t._value if hasattr(t, '_value') else t.value
+    if isinstance(value, bytearray):
+        return bytes(value)
+    if isinstance(value, list):
+        return list(value)
+    return value
+
+
+class Query:
+    """A set of conditions, which all have to hold for a chunk to match.
+
+    Conditions whose paths pass through the same ``[]`` have to hold for the
+    same element of that list, so ``('Items[].id', '==', 'minecraft:diamond')``
+    and ``('Items[].Count', '>=', 10)`` match a stack of at least ten diamonds.
+
+    Parameters
+    ----------
+    *conditions : Condition or tuple
+        ``(path, op, value)``, where op is one of `OPERATORS`
+    """
+
+    def __init__(self, *conditions):
+        self.conditions = [Condition(*c) for c in conditions]
+        self.root = _Node()
+        for i, c in enumerate(self.conditions):
+            if c.op not in OPERATORS:
+                raise ValueError(f'Unknown operator: {c.op}')
+            node = self.root
+            node.scope.add(i)
+            for step in _parse_path(c.path):
+                node = node.child(step)
+                node.scope.add(i)
+            node.conditions.append(i)
+
+    def _test(self, node: _Node, value, satisfied: set) -> None:
+        for i in node.conditions:
+            c = self.conditions[i]
+            if value is _CONTAINER and c.op != 'exists':
+                continue
+            try:
+                if OPERATORS[c.op](value, c.value):
+                    satisfied.add(i)
+            except TypeError:
+                pass
+
+    def _walk(self, buf, pos: int, typeID: int, node: _Node):
+        """Evaluates the conditions within ``node`` against the tag at ``pos``.
+
+        Returns
+        -------
+        tuple
+            the position after the tag and the set of satisfied conditions
+        """
+        satisfied = set()
+        if node.conditions:
+            self._test(node, _read(buf, pos, typeID), satisfied)
+
+        if typeID == 10 and node.names:
+            while len(satisfied) < len(node.scope):
+                childType = buf[pos]
+                pos += 1
+                if childType == 0:
+                    return pos, satisfied
+                length = unpack_from('>H', buf, pos)[0]
+                child = node.names.get(bytes(buf[pos + 2:pos + 2 + length]))
+                pos += 2 + length
+                if child is None:
+                    pos = _skip(buf, pos, childType)
+                else:
+                    pos, s = self._walk(buf, pos, childType, child)
+                    satisfied |= s
+            # everything is satisfied, skip the compound's remaining entries
+            return _skip(buf, pos, 10), satisfied
+
+        if typeID == 9 and (node.items is not None or node.index):
+            tagsType, length = unpack_from('>bi', buf, pos)
+            pos += 5
+            items = node.items
+            for i in range(length):
+                end = None
+                if items is not None:
+                    end, s = self._walk(buf, pos, tagsType, items)
+                    # conditions below [] have to hold for the same element
+                    if len(s) == len(items.scope):
+                        satisfied |= s
+                        items = None
+                if i in node.index:
+                    end, s = self._walk(buf, pos, tagsType, node.index[i])
+                    satisfied |= s
+                pos = _skip(buf, pos, tagsType) if end is None else end
+            return pos, satisfied
+
+        return _skip(buf, pos, typeID), satisfied
+
+    def matches_nbt(self, raw) -> bool:
+        """Evaluates the query against uncompressed binary NBT data."""
+        if not self.conditions:
+            return True
+        buf = memoryview(raw)
+        if buf[0] != 10:
+            raise NBTException('Invalid NBT Data!')
+        # skip the root's name, paths start inside the root compound
+        pos = 3 + unpack_from('>H', buf, 1)[0]
+        return len(self._walk(buf, pos, 10, self.root)[1]) == len(self.conditions)
+
+    def _walk_tag(self, t, node: _Node) -> set:
+        satisfied = set()
+        if node.conditions:
+            self._test(node, _tag_value(t), satisfied)
+        if isinstance(t, TAG_Compound):
+            for key, child in node.keys.items():
+                if key in t._value:
+                    satisfied |= self._walk_tag(t._value[key], child)
+        elif isinstance(t, TAG_List):
+            items = node.items
+            for i, item in enumerate(t._value):
+                if items is not None:
+                    s = self._walk_tag(item, items)
+                    if len(s) == len(items.scope):
+                        satisfied |= s
+                        items = None
+                if i in node.index:
+                    satisfied |= self._walk_tag(item, node.index[i])
+        return satisfied
+
+    def matches(self, t) -> bool:
+        """Evaluates the query against decoded tags."""
+        if not self.conditions:
+            return True
+        return len(self._walk_tag(t, self.root)) == len(self.conditions)
+
+    def _scan_region(self, path: Path) -> Iterator[Tuple[Coordinates, Chunk]]:
+        rx, rz = _region_coords(path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        if len(raw) < SECTOR_LEN * 2:
+            return
+        locations = unpack('>1024I', raw[:SECTOR_LEN])
+
+        with BytesIO(raw) as io:
+            # in order of their position in the file
+            for i in sorted((i for i in range(1024) if locations[i]), key=locations.__getitem__):
+                x, z = i % 32, i // 32
+                chunk = Chunk(x, z)
+                chunk._decode_region_entry(io)
+                if chunk._state not in (ChunkState.OK, ChunkState.TOO_BIG):
+                    continue
+                chunk._decode_header(io)
+                if chunk._state not in (ChunkState.OK, ChunkState.OVERLAPPING):
+                    continue
+                world = Coordinates(rx * 32 + x, rz * 32 + z)
+                try:
+                    raw_nbt = chunk._read_payload(io, path.parent / external_filename(*world))
+                    matched = self.matches_nbt(raw_nbt)
+                except (IOError, NBTException) as e:
+                    log.critical(f'Error scanning chunk {chunk._coords} of {path}')
+                    log.critical(e)
+                    continue
+                if matched:
+                    chunk._parse_payload(raw_nbt)
+                    yield world, chunk
+
+    def select(self, source) -> Iterator[Tuple[Coordinates, Chunk]]:
+        """Yields the in-world coordinates and decoded chunk of every matching chunk.
+
+        Parameters
+        ----------
+        source : Region, str or Path
+            a decoded `Region`, a region file or a directory of region files,
+            of which files not named like region files are skipped
+        """
+        if isinstance(source, Region):
+            for (x, z), chunk in source._chunks.items():
+                if chunk._state in (ChunkState.OK, ChunkState.OVERLAPPING, ChunkState.TOO_BIG) \
+                        and hasattr(chunk, '_value') and self.matches(chunk):
+                    yield Coordinates(source._coords.x * 32 + x, source._coords.z * 32 + z), chunk
+            return
+
+        source = Path(source)
+        if not source.is_dir():
+            yield from self._scan_region(source)
+            return
+        for path in sorted(source.glob('r.*.*.mca')):
+            if _parse_region_name(path) is None:
+                log.warning(f'\"{path}\" is not a valid region filename, skipping')
+                continue
+            yield from self._scan_region(path)
+
+
+def select(source, *conditions) -> Iterator[Tuple[Coordinates, Chunk]]:
+    """Shorthand for ``Query(*conditions).select(source)``."""
+    return Query(*conditions).select(source)
@@ -8,16 +8,28 @@ from struct import pack, unpack
 from collections.abc import MutableMapping
 from enum import Enum, unique
 from functools import cached_property
+from pathlib import Path
 
-from typing import NamedTuple, Tuple, Optional
+from typing import NamedTuple, Tuple, Optional, Dict
 
 from .nbt import NBTObj, NBTException
+from .stats import Stats
 
 log = logging.getLogger(__name__)
 
 
 SECTOR_LEN = 4096
 
+# set on the compression type of chunks stored in an external file
+EXTERNAL_FLAG = 0x80
+# block size used when reading external chunk files
+EXTERNAL_BLOCK = 1 << 16
+
+
+def external_filename(x: int, z: int) -> str:
+    """Name of the file holding the data of an oversized chunk, given its in-world coordinates."""
+    return f'c.{x}.{z}.mcc'
+
 
 @unique
 class ChunkState(Enum):
@@ -55,6 +67,7 @@ class Chunk(NBTObj):
 
         self._length = 0
         self._compression = Compression.NONE
+        self._external = False
 
         self._data = None
 
@@ -62,6 +75,14 @@ class Chunk(NBTObj):
 
         self._padding = 0
 
+        self._stats = None
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        state['_data'] = None
+        state['_stats'] = None
+        return state
+
     @cached_property
     def entryloc(self) -> int:
         return (self._coords.x + self._coords.z * 32) * 4
@@ -108,16 +129,25 @@ class Chunk(NBTObj):
 
     @property
     def data(self) -> BytesIO:
-        if hasattr(self, 'value'):
-            if self.value:
-                with BytesIO() as raw:
-                    self.saveNBT(io=raw)
-                    if self._compression is Compression.ZLIB:
-                        self._data = zlib.compress(raw.getvalue())
-                    elif self._compression is Compression.GZIP:
-                        self._data = gzip.compress(raw.getvalue())
-                    else:
-                        self._data = raw.getvalue()
+        if hasattr(self, '_value'):
+            if self._value:
+                stats = self._stats
+                if stats is not None:
+                    start = stats.start()
+                with BytesIO() as io:
+                    self.saveNBT(io=io)
+                    raw = io.getvalue()
+                if stats is not None:
+                    stats.record('serialize', start, bytes_out=len(raw))
+                    start = stats.start()
+                if self._compression is Compression.ZLIB:
+                    self._data = zlib.compress(raw)
+                elif self._compression is Compression.GZIP:
+                    self._data = gzip.compress(raw)
+                else:
+                    self._data = raw
+                if stats is not None:
+                    stats.record('compress', start, len(raw), len(self._data))
                 self._state = ChunkState.OK
                 return self._data
 
@@ -198,32 +228,83 @@ class Chunk(NBTObj):
             self._sectors = sectors
             self._state = ChunkState.OK
 
+        comp = unpack('>B', io.read(1))[0]
+
+        # oversized chunks keep only their compression type in the region,
+        # their data is stored in a separate file
+        if comp & EXTERNAL_FLAG:
+            self._external = True
+            comp &= ~EXTERNAL_FLAG
         # a length of 1 or less means there is no data in the chunk
-        if length <= 1:
+        elif length <= 1:
             self._state = ChunkState.CORRUPTED
 
-        comp = unpack('>B', io.read(1))[0]
         try:
             self._compression = Compression(comp)
         except ValueError:
             log.critical(f'Invalid compression type: {comp}')
             self._state = ChunkState.CORRUPTED
 
-    def _decode_nbt(self, io: BytesIO) -> None:
-        io.seek(self._offset * SECTOR_LEN + 5)
+    def _read_external(self, path: Path) -> bytes:
+        # read block by block through an incremental decompressor, so the
+        # compressed data is never held as a whole, and joined once at the end;
+        # the result is not copied again when parsed, as BytesIO shares bytes
+        with open(path, 'rb') as f:
+            if self.compression is Compression.NONE:
+                return f.read()
+            d = zlib.decompressobj(31 if self.compression is Compression.GZIP else 15)
+            blocks = []
+            while True:
+                block = f.read(EXTERNAL_BLOCK)
+                if not block:
+                    break
+                blocks.append(d.decompress(block))
+            blocks.append(d.flush())
+            return b''.join(blocks)
+
+    def _read_payload(self, io: BytesIO, external: Optional[Path] = None) -> bytes:
+        """Reads and decompresses the chunk's NBT data.
+
+        Parameters
+        ----------
+        io : BytesIO
+            the region data
+        external : Path, optional
+            the file holding the data of an oversized chunk
+        """
+        stats = self._stats
+        if stats is not None:
+            start = stats.start()
+        if self._external:
+            if external is None:
+                raise IOError(f'Chunk {self._coords} is stored in a separate file, '
+                              'but the region\'s directory is unknown')
+            raw_nbt = self._read_external(external)
+            size = external.stat().st_size if stats is not None else 0
+        else:
+            io.seek(self._offset * SECTOR_LEN + 5)
+            raw = io.read(self._length - 1)
+            size = len(raw)
+            if self.compression is Compression.ZLIB:
+                raw_nbt = zlib.decompress(raw)
+            elif self.compression is Compression.GZIP:
+                raw_nbt = gzip.decompress(raw)
+            else:  # Compression is NONE
+                raw_nbt = raw
+        if stats is not None:
+            stats.record('decompress', start, size, len(raw_nbt))
+        return raw_nbt
+
+    def _parse_payload(self, raw_nbt) -> None:
+        stats = self._stats
         try:
-            with BytesIO() as tmpio:
-                if self.compression is Compression.ZLIB:
-                    tmpio.write(zlib.decompress(io.read(self._length - 1)))
-                elif self.compression is Compression.GZIP:
-                    tmpio.write(gzip.decompress(io.read(self._length - 1)))
-                else:  # Compression is NONE
-                    tmpio.write(io.read(self._length - 1))
-                tmpio.seek(0)
+            if stats is not None:
+                start = stats.start()
+            with BytesIO(raw_nbt) as tmpio:
                 super().__init__(tmpio)
-        except IOError as e:
-            log.critical(f'Error decoding chunk {self._coords}')
-            log.critical(e)
+            if stats is not None:
+                stats.record('parse', start, bytes_in=len(raw_nbt))
+                stats.count_tags(self)
         except NBTException as e:
             log.critical(f'Decoding data of chunk {self._coords} failed')
             log.critical(e)
@@ -231,14 +312,33 @@ class Chunk(NBTObj):
                 log.info('This is likely a result of another chunk overlapping '
                          'into this chunk\'s data')
 
-    def decode_chunk(self, io: BytesIO) -> None:
+    def _decode_nbt(self, io: BytesIO, external: Optional[Path] = None) -> None:
+        try:
+            raw_nbt = self._read_payload(io, external)
+        except IOError as e:
+            log.critical(f'Error decoding chunk {self._coords}')
+            log.critical(e)
+        else:
+            self._parse_payload(raw_nbt)
+
+    def decode_chunk(self, io: BytesIO, external: Optional[Path] = None) -> None:
+        """Decodes the chunk from region data.
+
+        Parameters
+        ----------
+        io : BytesIO
+            the region data
+        external : Path, optional
+            where the data of this chunk is stored, should it be oversized,
+            see `external_filename`
+        """
         self._decode_region_entry(io)
 
         if self._state in (ChunkState.OK, ChunkState.TOO_BIG):
             self._decode_header(io)
 
             if self._state in (ChunkState.OK, ChunkState.OVERLAPPING):
-                self._decode_nbt(io)
+                self._decode_nbt(io, external)
             else:
                 log.warning(f'Cannot decode any data for chunk {self._coords}')
 
@@ -247,6 +347,9 @@ class Chunk(NBTObj):
         else:
             log.warning(f'Chunk {self._coords} is corrupted, cannot decode')
 
+        if self._stats is not None:
+            self._stats.chunks_decoded[self._state] += 1
+
     def _encode_region_entry(self, io: BytesIO, offset=None, sectors=None) -> None:
         if offset is None:
             offset = self._offset
@@ -268,6 +371,12 @@ class Chunk(NBTObj):
         io.seek(self._offset * SECTOR_LEN + 5)
         io.write(self._data)
 
+    def _encode_external_header(self, io: BytesIO) -> None:
+        # a single sector, holding only the compression type
+        io.seek(self._offset * SECTOR_LEN)
+        io.write(pack('>IB', 1, self.compression.value | EXTERNAL_FLAG))
+        io.write((SECTOR_LEN - 5) * b'\x00')
+
     def encode_chunk(self, io: BytesIO, update_state=True) -> None:
         if update_state:
             state = self.state
@@ -283,8 +392,13 @@ class Chunk(NBTObj):
             log.debug(f'Chunk {self._coords} not yet generated, '
                       'skipping further encoding')
             self._encode_region_entry(io, 0, 0)
+        elif state is ChunkState.TOO_BIG and self._external:
+            log.debug(f'Chunk {self._coords} is too big, '
+                      'its data has to be stored in a separate file')
+            self._encode_region_entry(io, self._offset, 1)
+            self._encode_external_header(io)
         elif state is ChunkState.TOO_BIG:
-            log.warning(f'Chunk {self.coords} is too big, '
+            log.warning(f'Chunk {self._coords} is too big, '
                         'skipping further encoding')
             self._encode_region_entry(io, 0, 0)
         else:
@@ -293,14 +407,31 @@ class Chunk(NBTObj):
                         'and skipping further encoding')
             self._encode_region_entry(io, 0, 0)
 
+        if self._stats is not None:
+            self._stats.chunks_encoded[state] += 1
+
 
 class Region(MutableMapping):
 
-    def __init__(self, coords: Tuple[int, int]):
+    def __init__(self, coords: Tuple[int, int], stats: Optional[Stats] = None):
         self._coords = Coordinates(coords[0], coords[1])
         self._chunks = {}
+        self.stats = stats
+
+    def _external_filename(self, x: int, z: int) -> str:
+        return external_filename(x + self._coords.x * 32, z + self._coords.z * 32)
 
-    def decode_region(self, io: BytesIO):
+    def decode_region(self, io: BytesIO, directory: Optional[Path] = None):
+        """Decodes all chunks from region data.
+
+        Parameters
+        ----------
+        io : BytesIO
+            the region data
+        directory : Path, optional
+            the directory containing the region file, needed to read
+            oversized chunks, whose data is stored in separate files
+        """
         size = io.seek(0, 2)
         if size == 0:
             log.info(f'Region {self._coords} is empty')
@@ -312,9 +443,23 @@ class Region(MutableMapping):
         for x in range(32):
             for z in range(32):
                 c = self._chunks[x, z] = Chunk(x, z)
-                c.decode_chunk(io)
-
-    def encode_region(self, io: BytesIO):
+                c._stats = self.stats
+                c.decode_chunk(io, None if directory is None else
+                               Path(directory) / self._external_filename(x, z))
+
+    def encode_region(self, io: BytesIO, external: Optional[Dict[str, Optional[bytes]]] = None):
+        """Encodes all chunks into region data.
+
+        Parameters
+        ----------
+        io : BytesIO
+            the region data is written to
+        external : dict, optional
+            if given, chunks too big for the region are stored in separate
+            files; this is filled with the filenames and data to write
+            next to the region file, a value of None marks a file to delete,
+            as its chunk no longer needs it. Without it such chunks are dropped
+        """
         size = io.seek(0, 2)
 
         header_len = SECTOR_LEN * 2
@@ -328,12 +473,20 @@ class Region(MutableMapping):
         for x in range(32):
             for z in range(32):
                 chunk = self._chunks[x, z]
+                chunk._stats = self.stats
 
                 state = chunk.state
                 nxt = chunk.neighbour
 
+                was_external = chunk._external
+                chunk._external = external is not None and state is ChunkState.TOO_BIG
+                if chunk._external:
+                    external[self._external_filename(x, z)] = chunk._data
+                elif was_external and external is not None:
+                    external[self._external_filename(x, z)] = None
+
                 if first:
-                    if state is ChunkState.OK:
+                    if state is ChunkState.OK or chunk._external:
                         chunk._offset = 2
                         first = False
 
@@ -342,41 +495,54 @@ class Region(MutableMapping):
                 if nxt:
                     neighbour = self._chunks[nxt[0], nxt[1]]
                     if state is ChunkState.OK:
-                        neighbour._offset = offset + chunk.sectors
+                        # chunk.state already re-encoded the chunk's data,
+                        # use the cached sector count to avoid doing so again
+                        neighbour._offset = offset + chunk._sectors
+                    elif chunk._external:
+                        neighbour._offset = offset + 1
                     else:
                         neighbour._offset = offset
 
                 chunk.encode_chunk(io, update_state=False)
 
-    def __getitem__(self, key):
-        try:
-            return self._chunks[key]
-        except KeyError:
-            _key = key[0] - (self._coords.x * 32), key[1] - (self._coords.z * 32)
-            try:
-                return self._chunks[_key]
-            except KeyError:
+    def __getstate__(self):
+        # not yet created chunks are only pickled by their coordinates
+        state = self.__dict__.copy()
+        state['stats'] = None
+        state['_chunks'] = {}
+        state['_empty'] = []
+        for key, chunk in self._chunks.items():
+            if chunk._state is ChunkState.NOT_CREATED and \
+                    '_value' not in chunk.__dict__ and '_nbt' not in chunk.__dict__:
+                state['_empty'].append(key)
+            else:
+                state['_chunks'][key] = chunk
+        return state
+
+    def __setstate__(self, state):
+        empty = state.pop('_empty')
+        self.__dict__.update(state)
+        for key in empty:
+            self._chunks[key] = Chunk(key[0], key[1])
+
+    def _key(self, key) -> Tuple[int, int]:
+        # in-region coordinates are used as they are, in-world ones are converted
+        x, z = key
+        if not (0 <= x < 32 and 0 <= z < 32):
+            x, z = x - self._coords.x * 32, z - self._coords.z * 32
+            if not (0 <= x < 32 and 0 <= z < 32):
                 raise KeyError(f'Chunk {key} not in region file!')
+        return x, z
+
+    def __getitem__(self, key):
+        return self._chunks[self._key(key)]
 
     def __setitem__(self, key, value):
-        try:
-            self._chunks[key] = value
-        except KeyError:
-            _key = key[0] - (self._coords.x * 32), key[1] - (self._coords.z * 32)
-            try:
-                self._chunks[_key] = value
-            except KeyError:
-                raise KeyError(f'Chunk {key} not in region file!')
+        self._chunks[self._key(key)] = value
 
     def __delitem__(self, key):
-        try:
-            self._chunks[key] = Chunk(key[0], key[1])
-        except KeyError:
-            _key = key[0] - (self._coords.x * 32), key[1] - (self._coords.z * 32)
-            try:
-                self._chunks[_key] = Chunk(_key[0], _key[1])
-            except KeyError:
-                raise KeyError(f'Chunk {key} not in region file!')
+        x, z = self._key(key)
+        self._chunks[x, z] = Chunk(x, z)
 
     def __iter__(self):
         return iter(self._chunks)
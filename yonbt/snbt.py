@@ -0,0 +1,497 @@
+"""Streaming text export and import of NBT data.
+
+Two formats are supported: SNBT, the stringified NBT used by Minecraft
+commands, and a typed JSON representation, in which every tag is written
+as ``[type id, payload]``, list payloads being ``[tags type, [payloads]]``.
+Floats always contain a decimal point or exponent, so they keep their sign
+when zero, and non-finite floats, which JSON has no numbers for, are written
+as the strings ``"NaN"``, ``"Infinity"`` and ``"-Infinity"``.
+
+Writers emit text to a file-like object while walking a tag tree
+(`dump`, `dump_json`) or the binary NBT stream itself (`convert`),
+so memory use does not grow with the size of the data.
+"""
+import json
+import logging
+import math
+import re
+
+from io import StringIO
+from struct import pack, unpack
+
+from mutf8 import decode_modified_utf8
+
+from .nbt import _scalarFormats, _scalarSizes, _type_id, NBTException, NBTObj, tag, TAG_Byte, TAG_Short, \
+    TAG_Int, TAG_Long, TAG_Float, TAG_Double, TAG_Byte_Array, TAG_String, TAG_List, TAG_Compound, \
+    TAG_Int_Array, TAG_Long_Array
+
+log = logging.getLogger(__name__)
+
+
+# number of text pieces collected before they are written out
+BUFFER_SIZE = 4096
+
+
+class _Writer:
+    def __init__(self, fp, indent=None):
+        self.fp = fp
+        self.indent = indent
+        self.buffer = []
+        # one [element count, closing text, untyped children] per open container
+        self.frames = []
+        self.keyed = False
+
+    def write(self, s):
+        self.buffer.append(s)
+        if len(self.buffer) >= BUFFER_SIZE:
+            self.flush()
+
+    def flush(self):
+        self.fp.write(''.join(self.buffer))
+        self.buffer.clear()
+
+    def _newline(self):
+        self.write('\n' + ' ' * (self.indent * len(self.frames)))
+
+    def _begin(self):
+        # a value following a key needs no separator of its own
+        if self.keyed:
+            self.keyed = False
+            return
+        if self.frames:
+            frame = self.frames[-1]
+            if frame[0]:
+                self.write(',')
+            frame[0] += 1
+            if self.indent is not None:
+                self._newline()
+
+    def _open(self, s, closing, untyped=False):
+        self.write(s)
+        self.frames.append([0, closing, untyped])
+
+    def _close(self):
+        count, closing, _ = self.frames.pop()
+        if count and self.indent is not None:
+            self._newline()
+        self.write(closing)
+
+    def key(self, name):
+        self._begin()
+        self.write(self._key(name) + (': ' if self.indent is not None else ':'))
+        self.keyed = True
+
+    def end_compound(self):
+        self._close()
+
+    def end_list(self):
+        self._close()
+
+
+_bareKey = re.compile(r'[A-Za-z0-9._+-]+\Z')
+_escapable = re.compile(r'[\\"\n\r\t]')
+_escapes = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+def _quote(s: str) -> str:
+    return '"' + _escapable.sub(lambda m: _escapes[m.group()], s) + '"'
+
+
+def _float32(value: float) -> str:
+    # shortest representation reading back as the same 32 bit float
+    value = unpack('>f', pack('>f', value))[0]
+    for precision in range(6, 10):
+        s = f'{value:.{precision}g}'
+        if unpack('>f', pack('>f', float(s)))[0] == value:
+            return s
+    return repr(value)
+
+
+def _snbt_float(value: float, suffix: str) -> str:
+    if math.isnan(value):
+        return 'NaN' + suffix
+    if math.isinf(value):
+        return ('Infinity' if value > 0 else '-Infinity') + suffix
+    return (_float32(value) if suffix == 'f' else repr(value)) + suffix
+
+
+class _SNBTWriter(_Writer):
+    _suffixes = {1: 'b', 2: 's', 3: '', 4: 'L'}
+    _arrays = {7: ('[B;', 'b'), 11: ('[I;', ''), 12: ('[L;', 'L')}
+
+    @staticmethod
+    def _key(name):
+        return name if _bareKey.match(name) else _quote(name)
+
+    def scalar(self, typeID, value):
+        self._begin()
+        if typeID == 8:
+            self.write(_quote(value))
+        elif typeID == 5:
+            self.write(_snbt_float(value, 'f'))
+        elif typeID == 6:
+            self.write(_snbt_float(value, 'd'))
+        else:
+            self.write(f'{value}{self._suffixes[typeID]}')
+
+    def array(self, typeID, values):
+        self._begin()
+        prefix, suffix = self._arrays[typeID]
+        self.write(prefix + ','.join([f'{v}{suffix}' for v in values]) + ']')
+
+    def start_compound(self):
+        self._begin()
+        self._open('{', '}')
+
+    def start_list(self, tagsType):
+        self._begin()
+        self._open('[', ']')
+
+
+def _json_float(value: float, typeID: int) -> str:
+    if not math.isfinite(value):
+        return '"NaN"' if math.isnan(value) else '"Infinity"' if value > 0 else '"-Infinity"'
+    s = _float32(value) if typeID == 5 else repr(value)
+    # integral values, such as -0, would be read back as int and lose their sign
+    if '.' not in s and 'e' not in s:
+        s += '.0'
+    return s
+
+
+class _JSONWriter(_Writer):
+    _key = staticmethod(json.dumps)
+
+    def _typed(self):
+        # items of lists share the list's type and are written without one
+        self._begin()
+        return not (self.frames and self.frames[-1][2])
+
+    def scalar(self, typeID, value):
+        if typeID in (5, 6):
+            value = _json_float(value, typeID)
+        else:
+            value = json.dumps(value)
+        if self._typed():
+            self.write(f'[{typeID}, {value}]')
+        else:
+            self.write(value)
+
+    def array(self, typeID, values):
+        values = '[' + ', '.join(map(str, values)) + ']'
+        if self._typed():
+            self.write(f'[{typeID}, {values}]')
+        else:
+            self.write(values)
+
+    def start_compound(self):
+        if self._typed():
+            self._open('[10, {', '}]')
+        else:
+            self._open('{', '}')
+
+    def start_list(self, tagsType):
+        if self._typed():
+            self._open(f'[9, [{tagsType}, [', ']]]', untyped=True)
+        else:
+            self._open(f'[{tagsType}, [', ']]', untyped=True)
+
+
+def _walk(t, w: _Writer) -> None:
+    typeID = _type_id(t)
+    if typeID == 10:
+        w.start_compound()
+        for name, child in t._value.items():
+            w.key(name)
+            _walk(child, w)
+        w.end_compound()
+    elif typeID == 9:
+        w.start_list(t.tags_type or 0)
+        for child in t._value:
+            _walk(child, w)
+        w.end_list()
+    elif typeID == 7:
+        w.array(7, memoryview(t._value).cast('b'))
+    elif typeID in (11, 12):
+        w.array(typeID, t._value)
+    else:
+        w.scalar(typeID, t.value)
+
+
+def _read_string(io) -> str:
+    return decode_modified_utf8(io.read(unpack('>H', io.read(2))[0]))
+
+
+def _stream(io, typeID, w: _Writer) -> None:
+    if typeID in _scalarFormats:
+        w.scalar(typeID, unpack('>' + _scalarFormats[typeID], io.read(_scalarSizes[typeID]))[0])
+    elif typeID == 8:
+        w.scalar(8, _read_string(io))
+    elif typeID == 10:
+        w.start_compound()
+        while True:
+            childType = unpack('>b', io.read(1))[0]
+            if childType == 0:
+                break
+            w.key(_read_string(io))
+            _stream(io, childType, w)
+        w.end_compound()
+    elif typeID == 9:
+        tagsType, length = unpack('>bi', io.read(5))
+        w.start_list(tagsType)
+        for _ in range(length):
+            _stream(io, tagsType, w)
+        w.end_list()
+    elif typeID == 7:
+        length = unpack('>i', io.read(4))[0]
+        w.array(7, memoryview(io.read(length)).cast('b'))
+    elif typeID in (11, 12):
+        length = unpack('>i', io.read(4))[0]
+        fmt, size = ('i', 4) if typeID == 11 else ('q', 8)
+        w.array(typeID, unpack(f'>{length}{fmt}', io.read(length * size)))
+    else:
+        raise NBTException(f'Invalid tag type: {typeID}')
+
+
+_writers = {'snbt': _SNBTWriter, 'json': _JSONWriter}
+
+
+def convert(io, fp, fmt='snbt', indent=None) -> None:
+    """Converts uncompressed binary NBT to text, without decoding it into tags.
+
+    Parameters
+    ----------
+    io : binary file-like object
+        positioned at the start of the NBT data
+    fp : text file-like object
+        the text is written to
+    fmt : str
+        either ``'snbt'`` or ``'json'``
+    indent : int, optional
+        put every element on its own line, indented by this many spaces per level
+    """
+    if unpack('>b', io.read(1))[0] != 10:
+        raise NBTException('Invalid NBT Data!')
+    # the root name has no representation in either format
+    _read_string(io)
+    w = _writers[fmt](fp, indent)
+    _stream(io, 10, w)
+    w.flush()
+
+
+def dump(t, fp, indent=None) -> None:
+    """Writes a tag, and everything it contains, as SNBT to ``fp``."""
+    w = _SNBTWriter(fp, indent)
+    _walk(t, w)
+    w.flush()
+
+
+def dumps(t, indent=None) -> str:
+    with StringIO() as fp:
+        dump(t, fp, indent)
+        return fp.getvalue()
+
+
+def dump_json(t, fp, indent=None) -> None:
+    """Writes a tag, and everything it contains, as typed JSON to ``fp``."""
+    w = _JSONWriter(fp, indent)
+    _walk(t, w)
+    w.flush()
+
+
+def dumps_json(t, indent=None) -> str:
+    with StringIO() as fp:
+        dump_json(t, fp, indent)
+        return fp.getvalue()
+
+
+def _root(t):
+    # compounds at the top level become NBTObjs, so they can be saved as usual
+    if isinstance(t, TAG_Compound):
+        root = NBTObj()
+        root.name = ''
+        root.value = t.value
+        return root
+    return t
+
+
+_nonFinite = ('NaN', 'Infinity', '-Infinity')
+
+
+def _from_json(typeID, payload, name=None):
+    if typeID == 10:
+        return TAG_Compound(name, {k: _from_json(*v, name=k) for k, v in payload.items()})
+    if typeID == 9:
+        tagsType, items = payload
+        return TAG_List(name, [_from_json(tagsType, i) for i in items], tagsType)
+    if typeID == 7:
+        return TAG_Byte_Array(name, bytearray(v & 0xff for v in payload))
+    if typeID in (11, 12):
+        return tag[typeID](name, list(payload))
+    if typeID in (5, 6):
+        if isinstance(payload, str) and payload not in _nonFinite:
+            raise NBTException(f'Invalid float: {payload}')
+        return tag[typeID](name, float(payload))
+    if typeID in tag and typeID != 0:
+        return tag[typeID](name, payload)
+    raise NBTException(f'Invalid tag type: {typeID}')
+
+
+def loads_json(s: str):
+    return _root(_from_json(*json.loads(s)))
+
+
+def load_json(fp):
+    return _root(_from_json(*json.load(fp)))
+
+
+_whitespace = re.compile(r'\s*')
+_unquoted = re.compile(r'[A-Za-z0-9._+-]+')
+_quoted = re.compile(r'"((?:[^"\\]|\\.)*)"|\'((?:[^\'\\]|\\.)*)\'', re.S)
+_escaped = re.compile(r'\\(.)', re.S)
+_unescapes = {'n': '\n', 'r': '\r', 't': '\t'}
+_arrayStart = re.compile(r'\[\s*([BIL])\s*;')
+_integer = re.compile(r'([-+]?(?:0|[1-9][0-9]*))([bBsSlL]?)\Z')
+_decimal = re.compile(r'([-+]?(?:[0-9]+\.?|[0-9]*\.[0-9]+)(?:[eE][-+]?[0-9]+)?|[-+]?Infinity|NaN)([fFdD]?)\Z')
+_integerTags = {'': TAG_Int, 'b': TAG_Byte, 's': TAG_Short, 'l': TAG_Long}
+
+
+def _unescape(s: str) -> str:
+    return _escaped.sub(lambda m: _unescapes.get(m.group(1), m.group(1)), s) if '\\' in s else s
+
+
+class _Parser:
+    def __init__(self, s: str):
+        self.s = s
+        self.pos = 0
+
+    def error(self, message):
+        return NBTException(f'Invalid SNBT at position {self.pos}: {message}')
+
+    def skip(self) -> str:
+        self.pos = _whitespace.match(self.s, self.pos).end()
+        try:
+            return self.s[self.pos]
+        except IndexError:
+            raise self.error('unexpected end of data')
+
+    def expect(self, c):
+        if self.skip() != c:
+            raise self.error(f'expected "{c}"')
+        self.pos += 1
+
+    def string(self) -> str:
+        m = _quoted.match(self.s, self.pos)
+        if m is None:
+            raise self.error('unterminated string')
+        self.pos = m.end()
+        return _unescape(m.group(1) if m.group(1) is not None else m.group(2))
+
+    def token(self) -> str:
+        m = _unquoted.match(self.s, self.pos)
+        if m is None:
+            raise self.error(f'unexpected "{self.s[self.pos]}"')
+        self.pos = m.end()
+        return m.group()
+
+    def value(self, name=None):
+        c = self.skip()
+        if c == '{':
+            return self.compound(name)
+        if c == '[':
+            return self.list(name)
+        if c in '"\'':
+            return TAG_String(name, self.string())
+        return self.scalar(name, self.token())
+
+    def scalar(self, name, token):
+        m = _integer.match(token)
+        if m is not None:
+            return _integerTags[m.group(2).lower()](name, int(m.group(1)))
+        m = _decimal.match(token)
+        if m is not None and (m.group(2) or not m.group(1).lstrip('+-').isalpha()):
+            cls = TAG_Float if m.group(2) in ('f', 'F') else TAG_Double
+            return cls(name, float(m.group(1)))
+        if token == 'true':
+            return TAG_Byte(name, 1)
+        if token == 'false':
+            return TAG_Byte(name, 0)
+        return TAG_String(name, token)
+
+    def compound(self, name):
+        self.pos += 1
+        value = {}
+        if self.skip() == '}':
+            self.pos += 1
+            return TAG_Compound(name, value)
+        while True:
+            key = self.string() if self.skip() in '"\'' else self.token()
+            self.expect(':')
+            value[key] = self.value(key)
+            c = self.skip()
+            self.pos += 1
+            if c == '}':
+                return TAG_Compound(name, value)
+            if c != ',':
+                raise self.error('expected "," or "}"')
+
+    def list(self, name):
+        m = _arrayStart.match(self.s, self.pos)
+        if m is not None:
+            self.pos = m.end()
+            return self.array(name, m.group(1))
+        self.pos += 1
+        items = []
+        if self.skip() == ']':
+            self.pos += 1
+            return TAG_List(name, items, 0)
+        while True:
+            items.append(self.value())
+            c = self.skip()
+            self.pos += 1
+            if c == ']':
+                break
+            if c != ',':
+                raise self.error('expected "," or "]"')
+        tagsType = _type_id(items[0])
+        if any(_type_id(i) != tagsType for i in items):
+            raise self.error('list elements must all be of the same type')
+        return TAG_List(name, items, tagsType)
+
+    def array(self, name, kind):
+        values = []
+        if self.skip() != ']':
+            while True:
+                self.skip()
+                m = _integer.match(self.token())
+                if m is None:
+                    raise self.error('invalid array element')
+                values.append(int(m.group(1)))
+                c = self.skip()
+                self.pos += 1
+                if c == ']':
+                    break
+                if c != ',':
+                    raise self.error('expected "," or "]"')
+        else:
+            self.pos += 1
+        if kind == 'B':
+            return TAG_Byte_Array(name, bytearray(v & 0xff for v in values))
+        if kind == 'I':
+            return TAG_Int_Array(name, values)
+        return TAG_Long_Array(name, values)
+
+    def parse(self):
+        t = self.value()
+        self.pos = _whitespace.match(self.s, self.pos).end()
+        if self.pos != len(self.s):
+            raise self.error('trailing data')
+        return _root(t)
+
+
+def loads(s: str):
+    """Parses SNBT into tags; a compound at the top level is returned as `NBTObj`."""
+    return _Parser(s).parse()
+
+
+def load(fp):
+    return loads(fp.read())
@@ -0,0 +1,89 @@
+import logging
+
+from collections import Counter
+from time import perf_counter
+
+log = logging.getLogger(__name__)
+
+
+class Stats:
+    """Collects per-phase timings, byte counts, chunk and tag counts.
+
+    Pass an instance to `Region` or `RegionFile` to opt in; without one
+    nothing is measured. Phases are ``read``, ``decompress`` and ``parse``
+    when decoding and ``serialize``, ``compress`` and ``write`` when encoding.
+
+    Parameters
+    ----------
+    callback : callable, optional
+        called as ``callback(phase, seconds, bytes_in, bytes_out)``
+        every time a phase is recorded
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.times = Counter()
+        self.calls = Counter()
+        self.bytes_in = Counter()
+        self.bytes_out = Counter()
+        self.chunks_decoded = Counter()
+        self.chunks_encoded = Counter()
+        self.tags = Counter()
+
+    @staticmethod
+    def start() -> float:
+        return perf_counter()
+
+    def record(self, phase: str, start: float, bytes_in=0, bytes_out=0) -> None:
+        elapsed = perf_counter() - start
+        self.times[phase] += elapsed
+        self.calls[phase] += 1
+        self.bytes_in[phase] += bytes_in
+        self.bytes_out[phase] += bytes_out
+        if self.callback is not None:
+            self.callback(phase, elapsed, bytes_in, bytes_out)
+
+    def count_tags(self, root) -> None:
+        stack = [root]
+        while stack:
+            t = stack.pop()
+            self.tags[t.__class__.__name__] += 1
+            value = t._value if hasattr(t, '_value') else t.value
+            if isinstance(value, dict):
+                stack.extend(value.values())
+            elif isinstance(value, list) and value and hasattr(value[0], 'value'):
+                stack.extend(value)
+
+    def reset(self) -> None:
+        for counter in (self.times, self.calls, self.bytes_in, self.bytes_out,
+                        self.chunks_decoded, self.chunks_encoded, self.tags):
+            counter.clear()
+
+    def as_dict(self) -> dict:
+        return {
+            'phases': {
+                phase: {
+                    'seconds': self.times[phase],
+                    'calls': self.calls[phase],
+                    'bytes_in': self.bytes_in[phase],
+                    'bytes_out': self.bytes_out[phase]
+                } for phase in self.times
+            },
+            'chunks_decoded': {state.name: n for state, n in self.chunks_decoded.items()},
+            'chunks_encoded': {state.name: n for state, n in self.chunks_encoded.items()},
+            'tags': dict(self.tags)
+        }
+
+    def __str__(self):
+        lines = ['Phase        Seconds   Calls    Bytes in   Bytes out']
+        for phase in self.times:
+            lines.append(f'{phase:<10} {self.times[phase]:>9.4f} {self.calls[phase]:>7} '
+                         f'{self.bytes_in[phase]:>11} {self.bytes_out[phase]:>11}')
+        for title, counter in (('Decoded', self.chunks_decoded), ('Encoded', self.chunks_encoded)):
+            if counter:
+                lines.append(f'{title} chunks: ' +
+                             ', '.join(f'{state.name} {n}' for state, n in counter.items()))
+        if self.tags:
+            lines.append(f'Tags: {sum(self.tags.values())} ' +
+                         '(' + ', '.join(f'{name} {n}' for name, n in self.tags.most_common()) + ')')
+        return '\n'.join(lines)
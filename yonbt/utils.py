@@ -1,6 +1,6 @@
 import logging
 
-from typing import Tuple
+from typing import Dict, List, Tuple
 
 log = logging.getLogger(__name__)
 
@@ -17,3 +17,28 @@ def locateBlock(x: int, z: int) -> Tuple[str, Tuple[int, int]]:
 
 def locateChunk(x: int, z: int) -> str:
     return 'r.' + str(x // 32) + '.' + str(z // 32) + '.mca'
+
+
+def chunksInArea(x1: int, z1: int, x2: int, z2: int) -> Dict[Tuple[int, int], List[Tuple[int, int]]]:
+    """Finds the regions, and the chunks within them, covering an area of chunks.
+
+    Parameters
+    ----------
+    x1, z1, x2, z2 : int
+        in-world coordinates of two opposite corner chunks of the area, inclusive
+
+    Returns
+    -------
+    dict
+        maps the coordinates of every region overlapping the area
+        to the in-region coordinates of its chunks within the area
+    """
+    x1, x2 = min(x1, x2), max(x1, x2)
+    z1, z2 = min(z1, z2), max(z1, z2)
+    area = {}
+    for rx in range(x1 // 32, x2 // 32 + 1):
+        for rz in range(z1 // 32, z2 // 32 + 1):
+            xs = range(max(x1, rx * 32) - rx * 32, min(x2, rx * 32 + 31) - rx * 32 + 1)
+            zs = range(max(z1, rz * 32) - rz * 32, min(z2, rz * 32 + 31) - rz * 32 + 1)
+            area[rx, rz] = [(x, z) for x in xs for z in zs]
+    return area
@@ -0,0 +1,277 @@
+import hashlib
+import logging
+import mmap
+import os
+import tempfile
+
+from collections.abc import Mapping
+from pathlib import Path
+from struct import Struct, unpack_from
+
+from typing import Optional, Tuple
+
+from .files import _region_coords
+from .region import Chunk, ChunkState, Coordinates, SECTOR_LEN, external_filename
+
+log = logging.getLogger(__name__)
+
+
+# appended to every cache entry: the chunk's region header entry and timestamp
+_TRAILER = Struct('>II')
+
+
+def _default_cache_dir() -> Path:
+    # /dev/shm is memory backed on Linux, elsewhere fall back to the temp directory
+    base = Path('/dev/shm')
+    if not base.is_dir():
+        base = Path(tempfile.gettempdir())
+    return base / 'yonbt-chunks'
+
+
+class ChunkCache:
+    """Cache of decompressed chunk data, shared by all processes on a host.
+
+    Every entry is a file in ``directory``, which by default lives in
+    memory backed ``/dev/shm``. Entries are published with an atomic
+    rename and read through memory maps, so each chunk is decompressed
+    once per host and all readers share the same pages.
+
+    Each chunk has a single entry, which ends with the chunk's region header
+    entry and timestamp; a rewritten chunk is never served stale data and
+    its new entry simply replaces the old one.
+
+    Once the cache grows beyond ``max_size`` bytes, the least recently used
+    entries are removed. The size is checked whenever a process has added
+    an eighth of ``max_size`` since its last check, so with many processes
+    writing at once it can temporarily exceed the limit a bit.
+
+    Parameters
+    ----------
+    directory : str or Path, optional
+        where to keep the cache, created if it does not exist
+    max_size : int, optional
+        approximate limit of the cache's size in bytes, None for no limit
+    """
+
+    def __init__(self, directory=None, max_size: Optional[int] = 512 * 2 ** 20):
+        self.directory = Path(directory) if directory is not None else _default_cache_dir()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self._added = 0
+
+    @staticmethod
+    def _name(region, x: int, z: int) -> str:
+        digest = hashlib.blake2b(str(Path(region).resolve()).encode(), digest_size=8).hexdigest()
+        return f'{digest}.{x}.{z}'
+
+    def get(self, region, x: int, z: int, location: int, timestamp: int) -> Optional[mmap.mmap]:
+        """Returns the cached data of a chunk as read-only memory map, or None."""
+        try:
+            with open(self.directory / self._name(region, x, z), 'rb') as f:
+                size = f.seek(-_TRAILER.size, 2)
+                if size <= 0 or _TRAILER.unpack(f.read(_TRAILER.size)) != (location, timestamp):
+                    return None
+                if os.utime in os.supports_fd:
+                    # marks the entry as recently used
+                    os.utime(f.fileno())
+                return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, region, x: int, z: int, location: int, timestamp: int, data) -> None:
+        name = self._name(region, x, z)
+        tmp = self.directory / f'{name}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+            f.write(_TRAILER.pack(location, timestamp))
+        os.replace(tmp, self.directory / name)
+
+        if self.max_size is not None:
+            self._added += len(data) + _TRAILER.size
+            if self._added > self.max_size // 8:
+                self._evict()
+
+    def _evict(self) -> None:
+        self._added = 0
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_size:
+            return
+
+        # free a quarter of the cache at once, so this runs rarely
+        entries.sort()
+        target = self.max_size * 3 // 4
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        log.debug(f'Evicted chunk cache entries down to {total} bytes')
+
+    def clear(self) -> None:
+        for entry in self.directory.iterdir():
+            try:
+                entry.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class _MappedIO:
+    """Minimal file-like access to a memory map, as needed for decoding chunks."""
+
+    def __init__(self, mm):
+        self.mm = mm
+        self.pos = 0
+
+    def seek(self, pos: int, whence=0) -> int:
+        if whence == 1:
+            pos += self.pos
+        elif whence == 2:
+            pos += len(self.mm)
+        self.pos = pos
+        return pos
+
+    def read(self, size=-1) -> bytes:
+        end = len(self.mm) if size < 0 else self.pos + size
+        data = self.mm[self.pos:end]
+        self.pos += len(data)
+        return data
+
+
+class RegionView(Mapping):
+    """Read-only view of a region file, decoding chunks on access.
+
+    The region file is memory mapped, so processes viewing the same region
+    share its pages instead of each reading their own copy, and with a
+    `ChunkCache` each chunk is only decompressed once across processes.
+    Views can be pickled, to hand them to worker processes, which reopen
+    the region file on their side.
+
+    Parameters
+    ----------
+    filename : str or Path
+        the region file
+    cache : ChunkCache, optional
+        cache of decompressed chunk data to use
+    """
+
+    def __init__(self, filename, cache: Optional[ChunkCache] = None):
+        self.filename = filename
+        self.cache = cache
+        self._coords = Coordinates(*_region_coords(filename))
+        self._open()
+
+    def _open(self) -> None:
+        with open(self.filename, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        if size < SECTOR_LEN * 2:
+            log.warning(f'Region {self._coords} does not contain a header')
+            self._locations = self._timestamps = (0,) * 1024
+        else:
+            self._locations = unpack_from('>1024I', self._mm, 0)
+            self._timestamps = unpack_from('>1024I', self._mm, SECTOR_LEN)
+
+    def close(self) -> None:
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        return {'filename': self.filename, 'cache': self.cache}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._coords = Coordinates(*_region_coords(self.filename))
+        self._open()
+
+    def _key(self, key) -> Tuple[int, int]:
+        x, z = key
+        if not (0 <= x < 32 and 0 <= z < 32):
+            x, z = x - self._coords.x * 32, z - self._coords.z * 32
+            if not (0 <= x < 32 and 0 <= z < 32):
+                raise KeyError(f'Chunk {key} not in region file!')
+        return x, z
+
+    def timestamp(self, key) -> int:
+        x, z = self._key(key)
+        return self._timestamps[x + z * 32]
+
+    def payload(self, key):
+        """Returns the decompressed NBT data of a chunk, or None if it cannot be read.
+
+        With a cache this is a read-only memory map of the shared entry.
+        """
+        x, z = self._key(key)
+        chunk = Chunk(x, z)
+        io = _MappedIO(self._mm)
+        chunk._decode_region_entry(io)
+        if chunk._state not in (ChunkState.OK, ChunkState.TOO_BIG):
+            return None
+        chunk._decode_header(io)
+        if chunk._state not in (ChunkState.OK, ChunkState.OVERLAPPING):
+            return None
+        return self._payload(chunk, io)
+
+    def _payload(self, chunk: Chunk, io: _MappedIO):
+        x, z = chunk._coords
+        i = x + z * 32
+        if self.cache is not None:
+            data = self.cache.get(self.filename, x, z, self._locations[i], self._timestamps[i])
+            if data is not None:
+                return data
+
+        external = Path(self.filename).parent / external_filename(
+            x + self._coords.x * 32, z + self._coords.z * 32)
+        try:
+            data = chunk._read_payload(io, external)
+        except IOError as e:
+            log.critical(f'Error decoding chunk {chunk._coords}')
+            log.critical(e)
+            return None
+
+        if self.cache is not None:
+            self.cache.put(self.filename, x, z, self._locations[i], self._timestamps[i], data)
+        return data
+
+    def __getitem__(self, key) -> Chunk:
+        x, z = self._key(key)
+        chunk = Chunk(x, z)
+        io = _MappedIO(self._mm)
+        chunk._decode_region_entry(io)
+        if chunk._state in (ChunkState.OK, ChunkState.TOO_BIG):
+            chunk._decode_header(io)
+            if chunk._state in (ChunkState.OK, ChunkState.OVERLAPPING):
+                data = self._payload(chunk, io)
+                if data is not None:
+                    chunk._parse_payload(data)
+                    if isinstance(data, mmap.mmap):
+                        data.close()
+        return chunk
+
+    def __iter__(self):
+        return ((x, z) for x in range(32) for z in range(32))
+
+    def __len__(self):
+        return 1024
+
+    def __str__(self):
+        return f'RegionView {self._coords} of \"{self.filename}\"'